@@ -6,7 +6,9 @@ Posts system data to remote host over HTTP.
 """
 
 # Standard libraries
-from time import sleep
+import logging
+import signal
+import time
 import sys
 import os
 
@@ -22,10 +24,14 @@ else:
     sys.exit(2)
 
 # Pattoo libraries
-from pattoo import post
 from pattoo import configuration
 from pattoo.pattoo import POLLER_EXECUTABLE
 from pattoo import data
+from pattoo import sampler
+from pattoo import overhead
+from pattoo import uploader
+from pattoo import runtime
+from pattoo import breaker
 from pattoo import agent
 from pattoo import log
 
@@ -51,6 +57,9 @@ class PollingAgent(agent.Agent):
 
         # Get configuration
         self._config = configuration.ConfigAgent(self._agent_name)
+        self._sampler = None
+        self._overhead = None
+        self._uploader = None
 
     def name(self):
         """Return agent name.
@@ -76,16 +85,74 @@ class PollingAgent(agent.Agent):
             None
 
         """
-        # Post data to the remote server
+        # Receive SIGTERM in the polling loop instead of a signal handler,
+        # so that data is never spooled while a poll holds the spool's
+        # lock. It must be blocked before any threads are started
+        signal.pthread_sigmask(signal.SIG_BLOCK, [signal.SIGTERM])
+
+        # Read values that rarely change once at startup. Refresh them
+        # whenever a SIGHUP is received
+        data.refresh_timefixed()
+        signal.signal(signal.SIGHUP, data.refresh_timefixed)
+
+        # Record the costs of the agent. Log them at the next poll whenever
+        # a SIGUSR1 is received. The process ID changes when daemonizing,
+        # so this must be done here
+        self._overhead = overhead.Overhead()
+        signal.signal(signal.SIGUSR1, self._overhead.log)
+
+        # Sample gauges between uploads if configured. Threads don't
+        # survive daemonizing, so this must be done here
+        sample_interval = self._config.sample_interval()
+        if bool(sample_interval) is True:
+            self._sampler = sampler.Sampler(
+                data.backend(), sample_interval, self._config.interval())
+            self._sampler.start()
+
+        # Poll and post on an asyncio event loop if configured. It returns
+        # once SIGTERM is received
+        if self._config.runtime() == 'asyncio':
+            if runtime.available() is True:
+                signal.pthread_sigmask(signal.SIG_UNBLOCK, [signal.SIGTERM])
+                runtime.Runtime(
+                    self._config, sampler=self._sampler,
+                    overhead=self._overhead).run()
+                _exit()
+            log_message = (
+                'The "aiohttp" package is not installed. Using the threaded '
+                'runtime instead of asyncio.')
+            log.log2warning(1055, log_message)
+
+        # Post data from a separate thread so that slow posts don't delay
+        # polling
+        self._uploader = uploader.Uploader(
+            self._config.upload_queue_size(), overhead=self._overhead)
+        self._uploader.start()
+
+        # Poll on schedule against the monotonic clock
+        deadline = time.monotonic()
         while True:
             self.upload()
 
-            # Sleep
+            # Wait until the next poll, or until SIGTERM is received. Skip
+            # polls that are already late
             interval = self._config.interval()
-            sleep(interval)
+            deadline = max(deadline + interval, time.monotonic())
+            if signal.sigtimedwait(
+                    [signal.SIGTERM],
+                    max(0, deadline - time.monotonic())) is not None:
+                break
+
+        # A further SIGTERM kills the agent if spooling hangs
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, [signal.SIGTERM])
+
+        # Spool the data that hasn't been posted, including the latest poll
+        self._uploader.stop()
+        _exit()
 
     def upload(self):
-        """Post system data to the central server.
+        """Queue system data to be posted to the central server.
 
         Args:
             None
@@ -95,17 +162,30 @@ class PollingAgent(agent.Agent):
 
         """
         # Get system data
-        data_dict = data.poll(self._config)
+        data_dict = data.poll(
+            self._config, sampler=self._sampler, overhead=self._overhead,
+            breaker=breaker.breaker(self._config))
+
+        # Queue it for posting
+        self._uploader.put(data_dict)
 
-        # Post to remote server
-        server = post.Data(data_dict)
 
-        # Post data
-        success = server.post()
+def _exit():
+    """Exit the agent without waiting for hung collector threads.
 
-        # Purge cache if success is True
-        if success is True:
-            server.purge()
+    sys.exit() waits for the threads of every thread pool, so a collector
+    hung on a network filesystem would stop the agent from ever exiting.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    """
+    # Flush the log files, then exit
+    logging.shutdown()
+    os._exit(0)
 
 
 def main():
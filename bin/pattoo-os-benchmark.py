@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""Pattoo benchmark script.
+
+Compares the time taken by the psutil and native /proc collector backends,
+and measures the memory allocated when populating agent data.
+
+"""
+
+# Standard libraries
+import argparse
+from collections import defaultdict
+import timeit
+import tracemalloc
+import sys
+import os
+
+# Try to create a working PYTHONPATH
+_BIN_DIRECTORY = os.path.dirname(os.path.realpath(__file__))
+_ROOT_DIRECTORY = os.path.abspath(os.path.join(_BIN_DIRECTORY, os.pardir))
+if _BIN_DIRECTORY.endswith('/pattoo-os/bin') is True:
+    sys.path.append(_ROOT_DIRECTORY)
+else:
+    print(
+        'This script is not installed in the "pattoo-os/bin" directory. '
+        'Please fix.')
+    sys.exit(2)
+
+# pip3 libraries
+import psutil
+
+# Pattoo libraries
+from pattoo import procfs
+from pattoo import data
+from pattoo import configuration
+
+
+def backends(iterations):
+    """Print the time taken by each collector backend function.
+
+    Args:
+        iterations: Number of times to run each function
+
+    Returns:
+        None
+
+    """
+    # Initialize key variables
+    functions = [
+        ('cpu_times', lambda _: _.cpu_times()),
+        ('cpu_stats', lambda _: _.cpu_stats()),
+        ('virtual_memory', lambda _: _.virtual_memory()),
+        ('swap_memory', lambda _: _.swap_memory()),
+        ('disk_io_counters', lambda _: _.disk_io_counters(perdisk=True)),
+        ('net_io_counters', lambda _: _.net_io_counters(pernic=True)),
+        ('pids', lambda _: _.pids()),
+    ]
+
+    # Print header
+    print('{:<20}{:>14}{:>14}{:>10}'.format(
+        'function', 'psutil (us)', 'native (us)', 'speedup'))
+
+    # Time each function
+    for name, function in functions:
+        # Verify both backends report the same labels
+        psutil_result = function(psutil)
+        native_result = function(procfs)
+        if _labels(psutil_result) != _labels(native_result):
+            print('{:<20}labels differ between backends'.format(name))
+
+        # Time functions
+        psutil_time = min(timeit.repeat(
+            lambda: function(psutil), number=iterations, repeat=3))
+        native_time = min(timeit.repeat(
+            lambda: function(procfs), number=iterations, repeat=3))
+        print('{:<20}{:>14.1f}{:>14.1f}{:>9.1f}x'.format(
+            name,
+            psutil_time * 1000000 / iterations,
+            native_time * 1000000 / iterations,
+            psutil_time / max(native_time, 1e-9)))
+
+
+def allocations(sources):
+    """Print the memory allocated when populating data for many sources.
+
+    Args:
+        sources: Number of disks and network interfaces to simulate
+
+    Returns:
+        None
+
+    """
+    # Initialize key variables
+    config = configuration.ConfigAgent('pattoo-os-actived')
+    _data = data._Data(config)
+    fields = procfs.sdiskio._fields + procfs.snetio._fields
+    values = defaultdict(lambda: defaultdict(dict))
+    for field in fields:
+        for source in range(sources):
+            values[field]['device{}'.format(source)] = source
+
+    # Measure
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    _data.populate_dict('benchmark', values, base_type=64)
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Print results
+    statistics = after.compare_to(before, 'filename')
+    print('Populated {} series for {} sources'.format(len(fields), sources))
+    print('Peak traced memory (bytes): {}'.format(peak))
+    print('Memory retained (bytes):    {}'.format(
+        sum(stat.size_diff for stat in statistics)))
+    print('Blocks retained:            {}'.format(
+        sum(stat.count_diff for stat in statistics)))
+
+
+def _labels(result):
+    """Get the labels that would be created from a backend result.
+
+    Args:
+        result: Result of a backend function
+
+    Returns:
+        labels: Sorted list of (source, field) tuples
+
+    """
+    # Dicts of named tuples are keyed by source
+    if isinstance(result, dict) is True:
+        labels = sorted(
+            (source, field) for source, value in result.items()
+            for field in value._fields)
+    elif hasattr(result, '_fields') is True:
+        labels = sorted((None, field) for field in result._fields)
+    else:
+        labels = []
+    return labels
+
+
+def main():
+    """Run the benchmarks.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    """
+    # Get the CLI arguments
+    parser = argparse.ArgumentParser(
+        description='Benchmark the pattoo-os collector backends.')
+    parser.add_argument(
+        '--iterations',
+        required=False,
+        default=1000,
+        type=int,
+        help='Number of times to run each function.'
+    )
+    parser.add_argument(
+        '--allocations',
+        required=False,
+        default=0,
+        type=int,
+        help=('Measure memory allocated when populating data for this '
+              'number of sources instead of timing the backends.')
+    )
+    args = parser.parse_args()
+
+    # Run
+    if bool(args.allocations) is True:
+        allocations(args.allocations)
+    else:
+        backends(args.iterations)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""Pattoo stand-in receiver.
+
+Accepts data posted by pattoo-os-actived, singly or in batches, as JSON or
+MessagePack, and prints a summary of each request. Used to test agents
+without a pattoodb server. Runs on Flask, or on an asyncio event loop with
+aiohttp if requested.
+
+"""
+
+# Standard libraries
+import argparse
+import asyncio
+import gzip
+import io
+import json
+import random
+import time
+import sys
+import os
+
+# Try to create a working PYTHONPATH
+_BIN_DIRECTORY = os.path.dirname(os.path.realpath(__file__))
+_ROOT_DIRECTORY = os.path.abspath(os.path.join(_BIN_DIRECTORY, os.pardir))
+if _BIN_DIRECTORY.endswith('/pattoo-os/bin') is True:
+    sys.path.append(_ROOT_DIRECTORY)
+else:
+    print(
+        'This script is not installed in the "pattoo-os/bin" directory. '
+        'Please fix.')
+    sys.exit(2)
+
+# pip3 libraries
+from flask import Flask, abort, jsonify, request
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    from aiohttp import web
+except ImportError:
+    web = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Define flask parameters
+API = Flask(__name__)
+
+# Fraction of batched snapshots to leave unacknowledged, and seconds to
+# wait before responding
+_REJECT = [0.0]
+_DELAY = [0.0]
+
+# Media types that can be posted, advertised in the Accept-Post header
+if msgpack is None:
+    _ACCEPT_POST = 'application/json'
+else:
+    _ACCEPT_POST = 'application/msgpack, application/json'
+
+
+@API.route('/<path:uri>/receive/<agent_id>', methods=['POST'])
+def receive(uri, agent_id):
+    """Receive a single snapshot.
+
+    Args:
+        uri: Route prefix
+        agent_id: Agent ID
+
+    Returns:
+        None
+
+    """
+    # Read the snapshot
+    body = _decode(request.headers.get('Content-Encoding'), request.get_data())
+    snapshots = None if body is None else _loads(body, request.mimetype)
+    if snapshots is None:
+        abort(415)
+    time.sleep(_DELAY[0])
+    _snapshot(uri, agent_id, snapshots, request.mimetype)
+    return ''
+
+
+@API.route('/<path:uri>/receive/<agent_id>/batch', methods=['POST'])
+def receive_batch(uri, agent_id):
+    """Receive a batch of snapshots.
+
+    Args:
+        uri: Route prefix
+        agent_id: Agent ID
+
+    Returns:
+        None
+
+    """
+    # Read the snapshots
+    body = _decode(request.headers.get('Content-Encoding'), request.get_data())
+    snapshots = None if body is None else _loads(body, request.mimetype)
+    if snapshots is None:
+        abort(415)
+    time.sleep(_DELAY[0])
+    return jsonify(
+        {'acknowledged': _batch(uri, agent_id, snapshots, request.mimetype)})
+
+
+@API.after_request
+def advertise(response):
+    """Advertise the media types that can be posted.
+
+    Args:
+        response: Flask response object
+
+    Returns:
+        response: Flask response object
+
+    """
+    # Add the header
+    response.headers['Accept-Post'] = _ACCEPT_POST
+    return response
+
+
+async def receive_async(_request):
+    """Receive a single snapshot on the asyncio server.
+
+    Args:
+        _request: aiohttp.web.Request object
+
+    Returns:
+        result: aiohttp.web.Response object
+
+    """
+    # Read the snapshot
+    body = await _read(_request)
+    snapshots = _loads(body, _request.content_type)
+    if snapshots is None:
+        raise web.HTTPBadRequest()
+    await asyncio.sleep(_DELAY[0])
+    _snapshot(
+        _request.match_info['uri'], _request.match_info['agent_id'],
+        snapshots, _request.content_type)
+    return web.Response(headers={'Accept-Post': _ACCEPT_POST})
+
+
+async def receive_batch_async(_request):
+    """Receive a batch of snapshots on the asyncio server.
+
+    Args:
+        _request: aiohttp.web.Request object
+
+    Returns:
+        result: aiohttp.web.Response object
+
+    """
+    # Read the snapshots
+    body = await _read(_request)
+    snapshots = _loads(body, _request.content_type)
+    if snapshots is None:
+        raise web.HTTPBadRequest()
+    await asyncio.sleep(_DELAY[0])
+    acknowledged = _batch(
+        _request.match_info['uri'], _request.match_info['agent_id'],
+        snapshots, _request.content_type)
+    return web.json_response(
+        {'acknowledged': acknowledged},
+        headers={'Accept-Post': _ACCEPT_POST})
+
+
+async def _read(_request):
+    """Read and decompress the body of a request on the asyncio server.
+
+    aiohttp doesn't decompress bodies itself, as it only supports zstd
+    with a different package to the agent.
+
+    Args:
+        _request: aiohttp.web.Request object
+
+    Returns:
+        result: Body as bytes
+
+    """
+    # Return
+    result = _decode(
+        _request.headers.get('Content-Encoding'), await _request.read())
+    if result is None:
+        raise web.HTTPUnsupportedMediaType()
+    return result
+
+
+def _snapshot(uri, agent_id, snapshots, content_type):
+    """Print a summary of a single snapshot.
+
+    Args:
+        uri: Route prefix
+        agent_id: Agent ID
+        snapshots: List of snapshots in the request from _loads()
+        content_type: Media type of request
+
+    Returns:
+        None
+
+    """
+    # Print
+    snapshot = snapshots[0]
+    print('{} {} snapshot {} from agent {}'.format(
+        uri, content_type, snapshot.get('timestamp'), agent_id))
+
+
+def _batch(uri, agent_id, snapshots, content_type):
+    """Acknowledge a batch of snapshots and print a summary.
+
+    Args:
+        uri: Route prefix
+        agent_id: Agent ID
+        snapshots: List of snapshots in the request from _loads()
+        content_type: Media type of request
+
+    Returns:
+        acknowledged: Positions of the acknowledged snapshots in the batch
+
+    """
+    # Read the snapshots. Acknowledge their positions in the batch
+    acknowledged = []
+    timestamps = []
+    for index, snapshot in enumerate(snapshots):
+        if random.random() < _REJECT[0]:
+            continue
+        acknowledged.append(index)
+        timestamps.append(snapshot.get('timestamp'))
+    print('{} {} batch of {} snapshots from agent {}. Acknowledged {}'.format(
+        uri, content_type, len(snapshots), agent_id, timestamps))
+    return acknowledged
+
+
+def _loads(body, content_type):
+    """Deserialize the snapshots in the body of a request.
+
+    Args:
+        body: Decompressed body of request
+        content_type: Media type of body
+
+    Returns:
+        result: List of snapshots. None if the media type isn't supported
+
+    """
+    # MessagePack snapshots are back to back. JSON ones are one per line
+    if content_type == 'application/msgpack':
+        if msgpack is None:
+            return None
+        result = list(msgpack.Unpacker(
+            io.BytesIO(body), raw=False, strict_map_key=False))
+    else:
+        result = [json.loads(line) for line in body.splitlines()]
+    return result
+
+
+def _decode(encoding, body):
+    """Decompress the body of a request.
+
+    Args:
+        encoding: Content-Encoding of the request
+        body: Body of the request
+
+    Returns:
+        result: Body as bytes. None if the encoding isn't supported
+
+    """
+    # Decompress every gzip member or zstd frame
+    result = None
+    if encoding == 'gzip':
+        result = gzip.decompress(body)
+    elif encoding == 'zstd' and zstandard is not None:
+        reader = zstandard.ZstdDecompressor().stream_reader(
+            io.BytesIO(body), read_across_frames=True)
+        result = reader.read()
+    elif encoding is None:
+        result = body
+    return result
+
+
+def main():
+    """Start the stand-in receiver.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    """
+    # Get arguments
+    parser = argparse.ArgumentParser(
+        description='Receive data from pattoo-os-actived for testing.')
+    parser.add_argument(
+        '--address', default='127.0.0.1', help='Address to listen on.')
+    parser.add_argument(
+        '--port', type=int, default=6000, help='Port to listen on.')
+    parser.add_argument(
+        '--reject', type=float, default=0.0,
+        help='Fraction of batched snapshots to leave unacknowledged.')
+    parser.add_argument(
+        '--delay', type=float, default=0.0,
+        help='Seconds to wait before responding.')
+    parser.add_argument(
+        '--asyncio', action='store_true',
+        help='Serve requests on an asyncio event loop. Requires aiohttp.')
+    args = parser.parse_args()
+
+    # Run
+    _REJECT[0] = args.reject
+    _DELAY[0] = args.delay
+    if args.asyncio is True:
+        if web is None:
+            print('The "aiohttp" package is not installed.')
+            sys.exit(2)
+        application = web.Application(
+            handler_args={'auto_decompress': False})
+        application.router.add_post(
+            '/{uri:.+}/receive/{agent_id}', receive_async)
+        application.router.add_post(
+            '/{uri:.+}/receive/{agent_id}/batch', receive_batch_async)
+        web.run_app(application, host=args.address, port=args.port)
+    else:
+        API.run(host=args.address, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -25,6 +25,7 @@ from gunicorn.six import iteritems
 
 # Pattoo libraries
 from pattoo import daemon
+from pattoo import data
 from pattoo.pattoo import CONFIG
 from pattoo import log
 from pattoo.api import API
@@ -328,6 +329,9 @@ class AgentAPI(Agent):
                 config.log_file_api()))
         log.log2info(1022, log_message)
 
+        # Read values that rarely change before the workers are forked
+        data.refresh_timefixed()
+
         # Run
         StandaloneApplication(API, options).run()
 
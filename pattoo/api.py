@@ -1,17 +1,26 @@
 #!/usr/bin/env python3
 """This is a test of flask."""
 
+# Standard libraries
+import os
+
 # Pip packages
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify, request
 
 # Pattoo imports
 from pattoo import data
+from pattoo import overhead
+from pattoo import serializer
 from pattoo.pattoo import API_PREFIX
 from pattoo import configuration
 
 # Define flask parameters
 API = Flask(__name__)
 
+# Costs of the requests served by this process keyed by process ID.
+# gunicorn forks its workers after this module is imported
+_OVERHEAD = {}
+
 
 @API.route(API_PREFIX)
 def home():
@@ -26,10 +35,50 @@ def home():
     """
     # Initialize key variables
     agent_name = 'pattoo-os-passived'
+    costs = _overhead()
 
     # Get configuration
     config = configuration.ConfigAgent(agent_name)
 
+    # Return MessagePack if the client asks for it, otherwise JSON
+    data_dict = data.poll(config, overhead=costs)
+    _serializer = serializer.accepted(request.headers.get('Accept'))
+    body = serializer.dumps(data_dict, _serializer)
+    response = Response(
+        body, mimetype=serializer.CONTENT_TYPES[_serializer])
+    costs.record(len(body), overhead.series(data_dict))
+    return response
+
+
+@API.route('{}/overhead'.format(API_PREFIX))
+def overhead_summary():
+    """Display the costs of the most recent requests.
+
+    Args:
+        None
+
+    Returns:
+        None
+
+    """
     # Return
-    data_dict = data.poll(config)
-    return jsonify(data_dict)
+    return jsonify(_overhead().summary())
+
+
+def _overhead():
+    """Get the overhead of the current process.
+
+    Args:
+        None
+
+    Returns:
+        result: pattoo.overhead.Overhead object
+
+    """
+    # Create a new object after forking
+    pid = os.getpid()
+    if pid not in _OVERHEAD:
+        _OVERHEAD.clear()
+        _OVERHEAD[pid] = overhead.Overhead()
+    result = _OVERHEAD[pid]
+    return result
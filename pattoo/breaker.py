@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""Pattoo circuit breaker for the server.
+
+Description:
+
+    This module:
+        1) Stops posting to the server after repeated failures, so that
+           data is spooled straight away without waiting for timeouts
+        2) Lets a single probe through after a jittered, exponentially
+           increasing delay to check whether the server has recovered.
+           A probe whose outcome is never recorded counts as a failure
+           once its deadline has passed
+        3) Reports the state of the breaker and the number of times it
+           changed state as agent data
+
+"""
+# Standard libraries
+import random
+import threading
+import time
+
+# Pattoo libraries
+from pattoo import log
+
+# Breaker states
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+_STATES = (CLOSED, OPEN, HALF_OPEN)
+
+# Breakers keyed by (https, hostname, port), shared by all posts
+_BREAKERS = {}
+_LOCK = threading.Lock()
+
+
+class Breaker(object):
+    """Circuit breaker for posts to a server."""
+
+    def __init__(self, threshold=5, backoff=30, max_backoff=3600,
+                 probe_timeout=60):
+        """Initialize the class.
+
+        Args:
+            threshold: Number of consecutive failures that open the breaker.
+                The breaker never opens if 0
+            backoff: Seconds to wait before the first probe
+            max_backoff: Maximum seconds to wait between probes
+            probe_timeout: Seconds to wait for the outcome of a probe
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._threshold = threshold
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._probe_timeout = probe_timeout
+        self._state = CLOSED
+        self._failures = 0
+        self._probes = 0
+        self._retry = 0
+        self._deadline = 0
+        self._transitions = {state: 0 for state in _STATES}
+        self._lock = threading.Lock()
+
+    def state(self):
+        """Get the state of the breaker.
+
+        Args:
+            None
+
+        Returns:
+            result: CLOSED, OPEN or HALF_OPEN
+
+        """
+        # Return
+        with self._lock:
+            result = self._state
+        return result
+
+    def allow(self):
+        """Determine whether a request may be sent to the server.
+
+        Once the delay after opening has passed, the next request is let
+        through as a probe. No others are until the probe completes. Call
+        this only once the request is ready to send, and record its
+        outcome on every path.
+
+        Args:
+            None
+
+        Returns:
+            result: True if the request may be sent
+
+        """
+        # Initialize key variables
+        now = time.monotonic()
+
+        with self._lock:
+            # Reopen the breaker if the probe's outcome was never recorded
+            if self._state == HALF_OPEN and now >= self._deadline:
+                self._failures += 1
+                self._open()
+
+            # Return
+            if self._state == CLOSED:
+                result = True
+            elif self._state == OPEN and now >= self._retry:
+                self._deadline = now + self._probe_timeout
+                self._transition(HALF_OPEN)
+                result = True
+            else:
+                result = False
+        return result
+
+    def record(self, status):
+        """Record the outcome of a request.
+
+        Requests without a response, or with a server error, are failures.
+
+        Args:
+            status: HTTP status code of the response. None if there was no
+                response
+
+        Returns:
+            None
+
+        """
+        # Record
+        if status is None or status >= 500:
+            self.failure()
+        else:
+            self.success()
+
+    def success(self):
+        """Record a request that the server responded to.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Close the breaker
+        with self._lock:
+            self._failures = 0
+            self._probes = 0
+            if self._state != CLOSED:
+                self._transition(CLOSED)
+
+    def failure(self):
+        """Record a request that the server didn't respond to.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        with self._lock:
+            self._failures += 1
+
+            # Open the breaker after too many failures, or a failed probe
+            if self._state == HALF_OPEN or (
+                    self._state == CLOSED and
+                    bool(self._threshold) is True and
+                    self._failures >= self._threshold):
+                self._open()
+
+    def aggregates(self):
+        """Get the state of the breaker as agent data.
+
+        Args:
+            None
+
+        Returns:
+            result: List of (label, base_type, sources, values) tuples
+
+        """
+        # Return
+        with self._lock:
+            result = [
+                ('pattoo_agent_breaker_state', 1, list(_STATES),
+                 [int(state == self._state) for state in _STATES]),
+                ('pattoo_agent_breaker_transitions', 64, list(_STATES),
+                 [self._transitions[state] for state in _STATES])]
+        return result
+
+    def _open(self):
+        """Open the breaker until the next probe.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Double the delay after each failed probe. Spread the probes of
+        # many agents by shortening the delay by up to half (equal jitter)
+        delay = min(self._backoff * (2 ** self._probes), self._max_backoff)
+        delay = random.uniform(delay / 2, delay)
+        self._probes += 1
+        self._retry = time.monotonic() + delay
+        self._transition(OPEN)
+        log_message = (
+            'Server failed {} consecutive times. Spooling data without '
+            'contacting it for {:.0f} seconds'.format(self._failures, delay))
+        log.log2warning(1056, log_message)
+
+    def _transition(self, state):
+        """Change the state of the breaker.
+
+        Args:
+            state: New state
+
+        Returns:
+            None
+
+        """
+        # Change state
+        self._state = state
+        self._transitions[state] += 1
+        if state == CLOSED:
+            log_message = 'Server has recovered. Resuming posts'
+            log.log2info(1057, log_message)
+
+
+def breaker(config):
+    """Get the shared breaker for the server in the configuration.
+
+    Args:
+        config: ConfigAgent object
+
+    Returns:
+        result: Breaker object
+
+    """
+    # Initialize key variables
+    key = (
+        config.api_server_https() is True, config.api_server_name(),
+        config.api_server_port())
+
+    # Create the breaker only once
+    with _LOCK:
+        if key not in _BREAKERS:
+            _BREAKERS[key] = Breaker(
+                threshold=config.api_breaker_threshold(),
+                backoff=config.api_breaker_backoff(),
+                max_backoff=config.api_breaker_max_backoff(),
+                probe_timeout=(
+                    config.api_connect_timeout() +
+                    config.api_read_timeout()))
+        result = _BREAKERS[key]
+    return result
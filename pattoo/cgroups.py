@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""Pattoo cgroup v2 collector.
+
+Description:
+
+    This module:
+        1) Walks the cgroup v2 hierarchy once and caches the list of cgroups
+        2) Uses inotify to detect cgroups being created or removed, and
+           only walks the hierarchy again when that happens
+        3) Reads the CPU, memory, I/O and pressure files of every cgroup in
+           a single pass
+
+"""
+# Standard libraries
+import ctypes
+import errno
+import os
+import threading
+from collections import defaultdict
+
+# Pattoo libraries
+from pattoo import log
+
+# inotify constants from <sys/inotify.h>
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_ONLYDIR = 0x01000000
+_IN_MASK = (
+    _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE | _IN_ONLYDIR)
+
+# Locations of the cgroup v2 hierarchy on unified and hybrid systems
+_ROOTS = ('/sys/fs/cgroup', '/sys/fs/cgroup/unified')
+
+# io.stat counters to report. Other keys, such as those added by the
+# io.cost and io.latency controllers, aren't all integers
+_IO_KEYS = ('rbytes', 'wbytes', 'rios', 'wios', 'dbytes', 'dios')
+
+# Pressure files and the resource they describe
+_PRESSURE = (
+    ('cpu.pressure', 'cpu'),
+    ('memory.pressure', 'memory'),
+    ('io.pressure', 'io'),
+)
+
+
+class _Inotify(object):
+    """Minimal inotify wrapper for detecting changes to directories."""
+
+    def __init__(self):
+        """Initialize the class.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+    def watch(self, directory):
+        """Watch a directory for subdirectories being created or removed.
+
+        Args:
+            directory: Directory to watch
+
+        Returns:
+            None
+
+        """
+        # Add the watch
+        result = self._libc.inotify_add_watch(
+            self._fd, os.fsencode(directory), _IN_MASK)
+        if result < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_add_watch failed')
+
+    def changed(self):
+        """Determine whether any watched directory has changed.
+
+        Args:
+            None
+
+        Returns:
+            result: True if there are pending events
+
+        """
+        # Drain all pending events
+        result = False
+        while True:
+            try:
+                events = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            if bool(events) is False:
+                break
+            result = True
+        return result
+
+    def close(self):
+        """Stop watching all directories.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Close
+        os.close(self._fd)
+
+
+class Cgroups(object):
+    """Read metrics for every cgroup in the cgroup v2 hierarchy."""
+
+    def __init__(self):
+        """Initialize the class.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._root = None
+        self._paths = []
+        self._inotify = None
+        self._lock = threading.Lock()
+
+        # Find the cgroup v2 hierarchy
+        for root in _ROOTS:
+            if os.path.isfile(os.path.join(root, 'cgroup.controllers')):
+                self._root = root
+                break
+
+    def paths(self):
+        """Get the directories of all cgroups.
+
+        The hierarchy is only walked again after inotify reports that a
+        cgroup was created or removed. If inotify isn't usable, for
+        example because the watch limit was reached, the hierarchy is
+        walked on every call.
+
+        Args:
+            None
+
+        Returns:
+            result: List of cgroup directories
+
+        """
+        # Use the cached paths if nothing has changed
+        if self._inotify is not None:
+            if self._inotify.changed() is False:
+                return self._paths
+            self._inotify.close()
+            self._inotify = None
+
+        # Walk the hierarchy
+        self._paths = [
+            directory for directory, _, _ in os.walk(self._root)]
+
+        # Watch every cgroup for new or removed children
+        try:
+            self._inotify = _Inotify()
+            for directory in self._paths:
+                self._inotify.watch(directory)
+        except (OSError, AttributeError) as error:
+            if self._inotify is not None:
+                self._inotify.close()
+                self._inotify = None
+            if getattr(error, 'errno', None) != errno.ENOENT:
+                log_message = (
+                    'Unable to watch cgroups for changes. The cgroup '
+                    'hierarchy will be walked on every poll: {}'
+                    ''.format(error))
+                log.log2warning(1037, log_message)
+
+        # Return
+        result = self._paths
+        return result
+
+    def metrics(self):
+        """Read the metrics of all cgroups.
+
+        Args:
+            None
+
+        Returns:
+            result: (gauges, counters) tuple. Each is a dict of values
+                keyed by [label][cgroup path]
+
+        """
+        # Initialize key variables
+        gauges = defaultdict(dict)
+        counters = defaultdict(dict)
+
+        # Do nothing if there is no cgroup v2 hierarchy
+        if self._root is None:
+            return (gauges, counters)
+
+        with self._lock:
+            for directory in self.paths():
+                # Use the path relative to the root as the source
+                source = directory[len(self._root):] or '/'
+                try:
+                    _read_cgroup(directory, source, gauges, counters)
+                except FileNotFoundError:
+                    # The cgroup was removed while being read
+                    continue
+
+        # Return
+        result = (gauges, counters)
+        return result
+
+
+def _read_cgroup(directory, source, gauges, counters):
+    """Read the metrics of a single cgroup.
+
+    Args:
+        directory: Directory of the cgroup
+        source: Source name to use for the cgroup
+        gauges: Dict of gauge values keyed by [label][source] to update
+        counters: Dict of counter values keyed by [label][source] to update
+
+    Returns:
+        None
+
+    """
+    # CPU usage. All values are counters
+    contents = _read(directory, 'cpu.stat')
+    if contents is not None:
+        for line in contents.splitlines():
+            (key, value) = line.split()
+            counters['cpu_{}'.format(key)][source] = int(value)
+
+    # Memory usage isn't reported for the root cgroup
+    contents = _read(directory, 'memory.current')
+    if contents is not None:
+        gauges['memory_current'][source] = int(contents)
+
+    # I/O. Add up all devices
+    contents = _read(directory, 'io.stat')
+    if contents is not None:
+        totals = defaultdict(int)
+        for line in contents.splitlines():
+            for field in line.split()[1:]:
+                (key, _, value) = field.partition('=')
+                if key in _IO_KEYS and value.isdigit() is True:
+                    totals[key] += int(value)
+        for key, value in totals.items():
+            counters['io_{}'.format(key)][source] = value
+
+    # Pressure stall information
+    for filename, resource in _PRESSURE:
+        contents = _read(directory, filename)
+        if contents is None:
+            continue
+        for line in contents.splitlines():
+            fields = line.split()
+            for field in fields[1:]:
+                (key, value) = field.split('=')
+                label = '{}_pressure_{}_{}'.format(resource, fields[0], key)
+                if key == 'total':
+                    counters[label][source] = int(value)
+                else:
+                    gauges[label][source] = float(value)
+
+
+def _read(directory, filename):
+    """Read a cgroup file.
+
+    Args:
+        directory: Directory of the cgroup
+        filename: Name of the file
+
+    Returns:
+        result: Contents of the file. None if the controller is disabled
+
+    """
+    # Files of disabled controllers don't exist
+    filepath = os.path.join(directory, filename)
+    try:
+        with open(filepath) as f_handle:
+            result = f_handle.read()
+    except FileNotFoundError:
+        if os.path.isdir(directory) is False:
+            raise
+        result = None
+    except OSError:
+        # Pressure files can't be read when PSI is disabled
+        result = None
+    return result
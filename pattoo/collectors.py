@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""Pattoo collector registry.
+
+Description:
+
+    This module:
+        1) Keeps a registry of the collectors that populate agent data,
+           including plugins listed in the "collectors" configuration
+        2) Runs each collector only when its own interval has passed, in
+           parallel and with its own timeout
+        3) Merges the latest results of every collector into each poll
+        4) Optionally reports the time taken, the number of values
+           collected and the failures of each collector
+
+"""
+# Standard libraries
+import importlib
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+# Pattoo libraries
+from pattoo import log
+
+
+class _Collector(object):
+    """A collector and the results of its latest run."""
+
+    def __init__(self, name, function, timeout, interval):
+        """Initialize the class.
+
+        Args:
+            name: Name of collector
+            function: Function that populates a pattoo.data._Data object
+            timeout: Seconds to wait for the collector to complete
+            interval: Seconds between runs. Runs every poll if None
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self.name = name
+        self.function = function
+        self.timeout = timeout
+        self.interval = interval
+        self.enabled = True
+        self.last_run = None
+        self.result = None
+        self.cost = None
+        self.items = None
+        self.failures = 0
+        self.future = None
+
+    def run(self, _data):
+        """Run the collector, recording the time taken.
+
+        Args:
+            _data: pattoo.data._Data object to populate
+
+        Returns:
+            None
+
+        """
+        # Measure CPU time used by this thread only, as other collectors
+        # run at the same time
+        wall = time.monotonic()
+        cpu = time.thread_time()
+        try:
+            self.function(_data)
+        finally:
+            self.cost = (time.monotonic() - wall, time.thread_time() - cpu)
+
+    def due(self, now, tolerance):
+        """Determine whether the collector should run.
+
+        Args:
+            now: Current monotonic time
+            tolerance: Seconds early that the collector may run. This
+                stops collectors from skipping a poll due to small
+                variations in the polling interval
+
+        Returns:
+            result: True if due
+
+        """
+        # Return
+        if self.last_run is None or self.interval is None:
+            result = True
+        else:
+            result = now >= self.last_run + self.interval - tolerance
+        return result
+
+    def running(self):
+        """Determine whether the latest run is still in progress.
+
+        Args:
+            None
+
+        Returns:
+            result: True if running
+
+        """
+        # Return
+        result = self.future is not None and self.future.done() is False
+        return result
+
+
+class Registry(object):
+    """Registry of collectors."""
+
+    def __init__(self):
+        """Initialize the class.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._collectors = {}
+        self._configured = False
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def register(self, name, function, timeout=10, interval=None):
+        """Register a collector.
+
+        Args:
+            name: Name of collector
+            function: Function that populates a pattoo.data._Data object
+            timeout: Seconds to wait for the collector to complete
+            interval: Seconds between runs. Runs every poll if None
+
+        Returns:
+            None
+
+        """
+        # Register
+        self._collectors[name] = _Collector(name, function, timeout, interval)
+
+    def configure(self, config):
+        """Apply the "collectors" configuration once.
+
+        Each entry is keyed by collector name and may contain "interval",
+        "timeout" and "enabled" values. Entries for collectors that aren't
+        built in must have a "function" value of the form
+        "package.module:function".
+
+        Args:
+            config: ConfigAgent object
+
+        Returns:
+            None
+
+        """
+        # Only do this once
+        with self._lock:
+            if self._configured is True:
+                return
+            self._configured = True
+            self._configure(config)
+
+    def _configure(self, config):
+        """Apply the "collectors" configuration.
+
+        Args:
+            config: ConfigAgent object
+
+        Returns:
+            None
+
+        """
+        # Apply the configuration
+        for name, options in config.collectors().items():
+            options = options or {}
+            if 'function' in options:
+                function = _load(name, options['function'])
+                if function is None:
+                    continue
+                self.register(name, function)
+            elif name not in self._collectors:
+                log_message = (
+                    'Collector "{}" in the configuration has no "function" '
+                    'and is not a built in collector.'.format(name))
+                log.log2warning(1039, log_message)
+                continue
+
+            collector = self._collectors[name]
+            collector.interval = options.get('interval', collector.interval)
+            collector.timeout = options.get('timeout', collector.timeout)
+            collector.enabled = bool(options.get('enabled', True))
+
+        # Create a bounded thread pool. Each collector runs at most once at
+        # a time, so one hung in the kernel can't hold up the others
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(len(self._collectors), 1))
+
+    def collect(self, _data, poll_timeout, poll_interval, metrics=False):
+        """Run the collectors that are due and merge all latest results.
+
+        Each collector populates its own subset of the data. Collectors that
+        don't finish within their own timeout, or before the overall poll
+        deadline, are left out of the snapshot and are reported in the
+        "pattoo_agent_collector_timeout" timeseries instead. Collectors that
+        fail are left out of the snapshot too.
+
+        Args:
+            _data: pattoo.data._Data object
+            poll_timeout: Overall poll deadline in seconds
+            poll_interval: Seconds between polls
+            metrics: Report the latest wall time, CPU time and number of
+                values of each collector, and the number of times it
+                failed, if True
+
+        Returns:
+            None
+
+        """
+        # Polls from different threads share the results of each collector
+        with self._lock:
+            self._collect(_data, poll_timeout, poll_interval, metrics)
+
+    def _collect(self, _data, poll_timeout, poll_interval, metrics):
+        """Run the collectors that are due and merge all latest results.
+
+        Args:
+            _data: pattoo.data._Data object
+            poll_timeout: Overall poll deadline in seconds
+            poll_interval: Seconds between polls
+            metrics: Report the costs of each collector if True
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        start = time.monotonic()
+        deadline = start + poll_timeout
+        futures = []
+        timeouts = defaultdict(dict)
+        gauges = defaultdict(dict)
+        failures = defaultdict(dict)
+
+        # Start all the collectors that are due. Collectors still hung in
+        # a previous poll aren't started again, so they can't use up the
+        # thread pool
+        for collector in self._collectors.values():
+            if collector.enabled is False:
+                continue
+            if collector.due(start, poll_interval / 2) is False:
+                futures.append((collector, None, None))
+            elif collector.running() is True:
+                timeouts['timeout'][collector.name] = 1
+                log_message = (
+                    'Collector "{}" is still running from a previous poll. '
+                    'Posting a partial snapshot.'.format(collector.name))
+                log.log2warning(1072, log_message)
+            else:
+                _subset = _data.subset()
+                collector.future = self._executor.submit(
+                    collector.run, _subset)
+                futures.append((collector, _subset, collector.future))
+
+        # Merge the results of each collector in the same order as they
+        # would have been run serially
+        for collector, _subset, future in futures:
+            name = collector.name
+            if future is not None:
+                remaining = min(
+                    start + collector.timeout, deadline) - time.monotonic()
+                try:
+                    future.result(timeout=max(remaining, 0))
+                except FutureTimeoutError:
+                    # Don't start collectors that haven't been scheduled yet
+                    future.cancel()
+                    timeouts['timeout'][name] = 1
+                    log_message = (
+                        'Collector "{}" did not complete within {}s. Posting '
+                        'a partial snapshot.'.format(name, collector.timeout))
+                    log.log2warning(1035, log_message)
+                    continue
+                except Exception as error:
+                    collector.failures += 1
+                    collector.result = None
+                    log_message = (
+                        'Collector "{}" failed: {}'.format(name, error))
+                    log.log2warning(1042, log_message)
+                else:
+                    collector.result = _subset
+                    collector.items = sum(
+                        len(series.values) for series in _subset.series())
+                collector.last_run = start
+
+            # Use the latest result of collectors that weren't due
+            if collector.result is not None:
+                _data.merge(collector.result)
+            timeouts['timeout'][name] = 0
+
+            # Record the cost of the collector's latest run
+            if collector.cost is not None:
+                (wall, cpu) = collector.cost
+                gauges['wall_seconds'][name] = round(wall, 6)
+                gauges['cpu_seconds'][name] = round(cpu, 6)
+            if collector.items is not None:
+                gauges['items'][name] = collector.items
+            failures['failures'][name] = collector.failures
+
+        # Mark the collectors that timed out
+        _data.populate_dict('pattoo_agent_collector', timeouts)
+
+        # Report where collection time goes
+        if metrics is True:
+            _data.populate_dict('pattoo_agent_collector', gauges)
+            _data.populate_dict(
+                'pattoo_agent_collector', failures, base_type=64)
+
+
+def _load(name, path):
+    """Load a collector function from a "package.module:function" path.
+
+    Args:
+        name: Name of collector
+        path: Path of function
+
+    Returns:
+        result: Function. None if it can't be loaded
+
+    """
+    # Load the function
+    try:
+        (module_name, function_name) = path.split(':')
+        result = getattr(importlib.import_module(module_name), function_name)
+    except (ValueError, ImportError, AttributeError) as error:
+        log_message = (
+            'Unable to load function "{}" for collector "{}": {}'
+            ''.format(path, name, error))
+        log.log2warning(1038, log_message)
+        result = None
+    return result
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""Pattoo payload compression.
+
+Description:
+
+    This module:
+        1) Serializes agent data and compresses it. Without orjson, JSON is
+           compressed in chunks as it is serialized, so that the full JSON
+           string is never held in memory
+        2) Supports gzip, and zstd if the "zstandard" package is installed
+        3) Maps compression methods to HTTP Content-Encoding values and to
+           cache file extensions, so that compressed cache files can be
+           sent as they are
+        4) Provides compressed newlines for joining compressed payloads
+           into newline delimited JSON. Concatenated gzip members and zstd
+           frames are valid streams, so payloads don't need recompressing
+
+"""
+# Standard libraries
+import json
+import zlib
+
+# pip3 libraries
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Pattoo libraries
+from pattoo import log
+from pattoo import serializer
+
+# Cache file extensions keyed by compression method
+EXTENSIONS = {
+    None: '.json',
+    'gzip': '.json.gz',
+    'zstd': '.json.zst',
+}
+
+# Number of bytes of JSON to collect before compressing them
+_CHUNK_SIZE = 65536
+
+# Depth of the agent data at which each series is serialized in one go.
+# This is the data of a label in a section of a device
+_DEPTH = 4
+
+
+def method(compression):
+    """Get the compression method to use.
+
+    Args:
+        compression: Compression method in the configuration
+
+    Returns:
+        result: 'gzip', 'zstd' or None for no compression
+
+    """
+    # Initialize key variables
+    result = compression
+    if compression in [None, False, 'none', '']:
+        result = None
+    elif compression not in EXTENSIONS:
+        log_message = (
+            'Unknown compression method "{}". Sending data uncompressed.'
+            ''.format(compression))
+        log.log2warning(1046, log_message)
+        result = None
+    elif compression == 'zstd' and zstandard is None:
+        log_message = (
+            'The "zstandard" package is not installed. Using gzip instead '
+            'of zstd compression.')
+        log.log2warning(1047, log_message)
+        result = 'gzip'
+    return result
+
+
+def encode(data, compression, _serializer='json'):
+    """Serialize and compress data.
+
+    Args:
+        data: Data to serialize
+        compression: 'gzip', 'zstd' or None for no compression
+        _serializer: 'json' or 'msgpack'
+
+    Returns:
+        result: Serialized data as bytes
+
+    """
+    # Uncompressed data is serialized in one go
+    if compression is None:
+        return serializer.dumps(data, _serializer)
+
+    # Get the compressor
+    if compression == 'zstd':
+        compressor = zstandard.ZstdCompressor().compressobj()
+    else:
+        compressor = zlib.compressobj(wbits=31)
+
+    # The fast serializers are quick enough to serialize in one go
+    if _serializer != 'json' or serializer.orjson is not None:
+        result = compressor.compress(
+            serializer.dumps(data, _serializer)) + compressor.flush()
+        return result
+
+    # Otherwise compress the JSON as it is generated
+    output = []
+    chunks = []
+    size = 0
+    for chunk in _iterencode(data, _DEPTH):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= _CHUNK_SIZE:
+            output.append(compressor.compress(''.join(chunks).encode()))
+            chunks = []
+            size = 0
+    output.append(compressor.compress(''.join(chunks).encode()))
+    output.append(compressor.flush())
+
+    # Return
+    result = b''.join(output)
+    return result
+
+
+def newline(compression):
+    """Get a newline compressed on its own.
+
+    Args:
+        compression: 'gzip', 'zstd' or None for no compression
+
+    Returns:
+        result: Compressed newline as bytes
+
+    """
+    # Return
+    if compression is None:
+        result = b'\n'
+    elif compression == 'zstd':
+        result = zstandard.ZstdCompressor().compress(b'\n')
+    else:
+        compressor = zlib.compressobj(wbits=31)
+        result = compressor.compress(b'\n') + compressor.flush()
+    return result
+
+
+def _iterencode(data, depth):
+    """Serialize data to JSON in chunks.
+
+    The output is the same as json.dumps(). Dicts are walked down to the
+    given depth, below which values are serialized with the C encoder.
+
+    Args:
+        data: Data to serialize
+        depth: Number of levels of dicts to walk
+
+    Yields:
+        chunk: JSON string
+
+    """
+    # Serialize small values in one go
+    if depth == 0 or isinstance(data, dict) is False or bool(data) is False:
+        yield json.dumps(data)
+        return
+
+    # Walk dicts
+    separator = '{'
+    for key, value in data.items():
+        yield '{}{}: '.format(separator, _key(key))
+        yield from _iterencode(value, depth - 1)
+        separator = ', '
+    yield '}'
+
+
+def _key(key):
+    """Serialize a dict key to JSON the same way as json.dumps().
+
+    Args:
+        key: Dict key
+
+    Returns:
+        result: JSON string
+
+    """
+    # Keys that aren't strings are converted like values, then quoted
+    if isinstance(key, str) is False:
+        key = json.dumps(key)
+    result = json.dumps(key)
+    return result
+
+
+def compression(filename):
+    """Get the compression method of a cache file from its name.
+
+    Args:
+        filename: Name of cache file
+
+    Returns:
+        result: 'gzip', 'zstd' or None for no compression
+
+    """
+    # Uncompressed cache files are the only ones ending with ".json"
+    result = None
+    for _compression, extension in EXTENSIONS.items():
+        if _compression is not None and filename.endswith(extension):
+            result = _compression
+    return result
@@ -51,6 +51,198 @@ class Config(object):
             result = int(intermediate)
         return result
 
+    def poll_timeout(self):
+        """Get poll_timeout.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Get result
+        key = 'main'
+        sub_key = 'poll_timeout'
+        intermediate = _key_sub_key(key, sub_key, self._config_dict, die=False)
+
+        # Default to 30
+        if intermediate is None:
+            result = 30
+        else:
+            result = float(intermediate)
+        return result
+
+    def disk_usage_timeout(self):
+        """Get disk_usage_timeout.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Get result
+        key = 'main'
+        sub_key = 'disk_usage_timeout'
+        intermediate = _key_sub_key(key, sub_key, self._config_dict, die=False)
+
+        # Default to 5
+        if intermediate is None:
+            result = 5
+        else:
+            result = float(intermediate)
+        return result
+
+    def timefixed_ttl(self):
+        """Get timefixed_ttl.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Get result
+        key = 'main'
+        sub_key = 'timefixed_ttl'
+        intermediate = _key_sub_key(key, sub_key, self._config_dict, die=False)
+
+        # Default to 86400
+        if intermediate is None:
+            result = 86400
+        else:
+            result = int(intermediate)
+        return result
+
+    def collector_backend(self):
+        """Get collector_backend.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Get result
+        key = 'main'
+        sub_key = 'collector_backend'
+        intermediate = _key_sub_key(key, sub_key, self._config_dict, die=False)
+
+        # Default to psutil
+        if intermediate is None:
+            result = 'psutil'
+        else:
+            result = '{}'.format(intermediate).lower()
+        return result
+
+    def counter_mode(self):
+        """Get counter_mode.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Get result
+        key = 'main'
+        sub_key = 'counter_mode'
+        intermediate = _key_sub_key(key, sub_key, self._config_dict, die=False)
+
+        # Default to counter
+        if intermediate is None:
+            result = 'counter'
+        else:
+            result = '{}'.format(intermediate).lower()
+        return result
+
+    def process_top(self):
+        """Get process_top.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Get result
+        key = 'main'
+        sub_key = 'process_top'
+        intermediate = _key_sub_key(key, sub_key, self._config_dict, die=False)
+
+        # Default to 0, which disables process data
+        if intermediate is None:
+            result = 0
+        else:
+            result = int(intermediate)
+        return result
+
+    def cgroups(self):
+        """Get cgroups.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Get result
+        key = 'main'
+        sub_key = 'cgroups'
+        result = _key_sub_key(key, sub_key, self._config_dict, die=False)
+
+        # Default to False
+        if result is None:
+            result = False
+        return result
+
+    def collector_metrics(self):
+        """Get collector_metrics.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Get result
+        key = 'main'
+        sub_key = 'collector_metrics'
+        result = _key_sub_key(key, sub_key, self._config_dict, die=False)
+
+        # Default to False
+        if result is None:
+            result = False
+        return result
+
+    def percpu(self):
+        """Get percpu.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Get result
+        key = 'main'
+        sub_key = 'percpu'
+        result = _key_sub_key(key, sub_key, self._config_dict, die=False)
+
+        # Default to False
+        if result is None:
+            result = False
+        return result
+
     def listen_address(self):
         """Get listen_address.
 
@@ -62,17 +254,337 @@ class Config(object):
 
         """
         # Get result
-        key = 'pattoo-os-passived'
-        sub_key = 'listen_address'
-        result = _key_sub_key(key, sub_key, self._config_dict, die=False)
+        key = 'pattoo-os-passived'
+        sub_key = 'listen_address'
+        result = _key_sub_key(key, sub_key, self._config_dict, die=False)
+
+        # Default to 0.0.0.0
+        if result is None:
+            result = '0.0.0.0'
+        return result
+
+    def bind_port(self):
+        """Get bind_port.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Get result
+        key = 'pattoo-os-passived'
+        sub_key = 'bind_port'
+        intermediate = _key_sub_key(key, sub_key, self._config_dict, die=False)
+
+        # Default to 6000
+        if intermediate is None:
+            result = 5000
+        else:
+            result = int(intermediate)
+        return result
+
+    def api_server_name(self):
+        """Get api_server_name.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Initialize key variables
+        key = 'pattoo-os-actived'
+        sub_key = 'api_server_name'
+
+        # Get result
+        result = _key_sub_key(key, sub_key, self._config_dict, die=False)
+        if result is None:
+            result = 'localhost'
+        return result
+
+    def api_server_port(self):
+        """Get api_server_port.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Initialize key variables
+        key = 'pattoo-os-actived'
+        sub_key = 'api_server_port'
+
+        # Get result
+        intermediate = _key_sub_key(key, sub_key, self._config_dict, die=False)
+        if intermediate is None:
+            result = 6000
+        else:
+            result = int(intermediate)
+        return result
+
+    def api_server_https(self):
+        """Get api_server_https.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Initialize key variables
+        key = 'pattoo-os-actived'
+        sub_key = 'api_server_https'
+
+        # Get result
+        result = _key_sub_key(key, sub_key, self._config_dict, die=False)
+        if result is None:
+            result = False
+        return result
+
+    def api_connect_timeout(self):
+        """Get api_connect_timeout.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Initialize key variables
+        key = 'pattoo-os-actived'
+        sub_key = 'api_connect_timeout'
+
+        # Get result
+        intermediate = _key_sub_key(key, sub_key, self._config_dict, die=False)
+        if intermediate is None:
+            result = 5
+        else:
+            result = float(intermediate)
+        return result
+
+    def api_read_timeout(self):
+        """Get api_read_timeout.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Initialize key variables
+        key = 'pattoo-os-actived'
+        sub_key = 'api_read_timeout'
+
+        # Get result
+        intermediate = _key_sub_key(key, sub_key, self._config_dict, die=False)
+        if intermediate is None:
+            result = 30
+        else:
+            result = float(intermediate)
+        return result
+
+    def api_dns_ttl(self):
+        """Get api_dns_ttl.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Initialize key variables
+        key = 'pattoo-os-actived'
+        sub_key = 'api_dns_ttl'
+
+        # Get result
+        intermediate = _key_sub_key(key, sub_key, self._config_dict, die=False)
+        if intermediate is None:
+            result = 300
+        else:
+            result = float(intermediate)
+        return result
+
+    def api_compression(self):
+        """Get api_compression.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Initialize key variables
+        key = 'pattoo-os-actived'
+        sub_key = 'api_compression'
+
+        # Get result
+        result = _key_sub_key(key, sub_key, self._config_dict, die=False)
+        if result is None:
+            result = 'none'
+        return result
+
+    def api_serializer(self):
+        """Get api_serializer.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Initialize key variables
+        key = 'pattoo-os-actived'
+        sub_key = 'api_serializer'
+
+        # Get result
+        result = _key_sub_key(key, sub_key, self._config_dict, die=False)
+        if result is None:
+            result = 'auto'
+        return result
+
+    def api_batch_count(self):
+        """Get api_batch_count.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Initialize key variables
+        key = 'pattoo-os-actived'
+        sub_key = 'api_batch_count'
+
+        # Get result
+        intermediate = _key_sub_key(key, sub_key, self._config_dict, die=False)
+        if intermediate is None:
+            result = 0
+        else:
+            result = int(intermediate)
+        return result
 
-        # Default to 0.0.0.0
+    def api_batch_bytes(self):
+        """Get api_batch_bytes.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Initialize key variables
+        key = 'pattoo-os-actived'
+        sub_key = 'api_batch_bytes'
+
+        # Get result
+        intermediate = _key_sub_key(key, sub_key, self._config_dict, die=False)
+        if intermediate is None:
+            result = 1048576
+        else:
+            result = int(intermediate)
+        return result
+
+    def spool_segment_bytes(self):
+        """Get spool_segment_bytes.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Initialize key variables
+        key = 'pattoo-os-actived'
+        sub_key = 'spool_segment_bytes'
+
+        # Get result
+        intermediate = _key_sub_key(key, sub_key, self._config_dict, die=False)
+        if intermediate is None:
+            result = 4194304
+        else:
+            result = int(intermediate)
+        return result
+
+    def spool_max_bytes(self):
+        """Get spool_max_bytes.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Initialize key variables
+        key = 'pattoo-os-actived'
+        sub_key = 'spool_max_bytes'
+
+        # Get result
+        intermediate = _key_sub_key(key, sub_key, self._config_dict, die=False)
+        if intermediate is None:
+            result = 104857600
+        else:
+            result = int(intermediate)
+        return result
+
+    def spool_max_age(self):
+        """Get spool_max_age.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Initialize key variables
+        key = 'pattoo-os-actived'
+        sub_key = 'spool_max_age'
+
+        # Get result
+        intermediate = _key_sub_key(key, sub_key, self._config_dict, die=False)
+        if intermediate is None:
+            result = 604800
+        else:
+            result = int(intermediate)
+        return result
+
+    def spool_fsync(self):
+        """Get spool_fsync.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Initialize key variables
+        key = 'pattoo-os-actived'
+        sub_key = 'spool_fsync'
+
+        # Get result
+        result = _key_sub_key(key, sub_key, self._config_dict, die=False)
         if result is None:
-            result = '0.0.0.0'
+            result = 'always'
         return result
 
-    def bind_port(self):
-        """Get bind_port.
+    def api_drain_workers(self):
+        """Get api_drain_workers.
 
         Args:
             None
@@ -81,20 +593,64 @@ class Config(object):
             result: result
 
         """
+        # Initialize key variables
+        key = 'pattoo-os-actived'
+        sub_key = 'api_drain_workers'
+
         # Get result
-        key = 'pattoo-os-passived'
-        sub_key = 'bind_port'
         intermediate = _key_sub_key(key, sub_key, self._config_dict, die=False)
+        if intermediate is None:
+            result = 1
+        else:
+            result = int(intermediate)
+        return result
 
-        # Default to 6000
+    def api_drain_rate(self):
+        """Get api_drain_rate.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Initialize key variables
+        key = 'pattoo-os-actived'
+        sub_key = 'api_drain_rate'
+
+        # Get result
+        intermediate = _key_sub_key(key, sub_key, self._config_dict, die=False)
         if intermediate is None:
-            result = 5000
+            result = 0
+        else:
+            result = float(intermediate)
+        return result
+
+    def api_drain_burst(self):
+        """Get api_drain_burst.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Initialize key variables
+        key = 'pattoo-os-actived'
+        sub_key = 'api_drain_burst'
+
+        # Get result
+        intermediate = _key_sub_key(key, sub_key, self._config_dict, die=False)
+        if intermediate is None:
+            result = 1
         else:
             result = int(intermediate)
         return result
 
-    def api_server_name(self):
-        """Get api_server_name.
+    def api_drain_order(self):
+        """Get api_drain_order.
 
         Args:
             None
@@ -105,16 +661,16 @@ class Config(object):
         """
         # Initialize key variables
         key = 'pattoo-os-actived'
-        sub_key = 'api_server_name'
+        sub_key = 'api_drain_order'
 
         # Get result
         result = _key_sub_key(key, sub_key, self._config_dict, die=False)
         if result is None:
-            result = 'localhost'
+            result = 'oldest'
         return result
 
-    def api_server_port(self):
-        """Get api_server_port.
+    def api_breaker_threshold(self):
+        """Get api_breaker_threshold.
 
         Args:
             None
@@ -125,18 +681,18 @@ class Config(object):
         """
         # Initialize key variables
         key = 'pattoo-os-actived'
-        sub_key = 'api_server_port'
+        sub_key = 'api_breaker_threshold'
 
         # Get result
         intermediate = _key_sub_key(key, sub_key, self._config_dict, die=False)
         if intermediate is None:
-            result = 6000
+            result = 5
         else:
             result = int(intermediate)
         return result
 
-    def api_server_https(self):
-        """Get api_server_https.
+    def api_breaker_backoff(self):
+        """Get api_breaker_backoff.
 
         Args:
             None
@@ -147,12 +703,100 @@ class Config(object):
         """
         # Initialize key variables
         key = 'pattoo-os-actived'
-        sub_key = 'api_server_https'
+        sub_key = 'api_breaker_backoff'
+
+        # Get result
+        intermediate = _key_sub_key(key, sub_key, self._config_dict, die=False)
+        if intermediate is None:
+            result = 30
+        else:
+            result = float(intermediate)
+        return result
+
+    def api_breaker_max_backoff(self):
+        """Get api_breaker_max_backoff.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Initialize key variables
+        key = 'pattoo-os-actived'
+        sub_key = 'api_breaker_max_backoff'
+
+        # Get result
+        intermediate = _key_sub_key(key, sub_key, self._config_dict, die=False)
+        if intermediate is None:
+            result = 3600
+        else:
+            result = float(intermediate)
+        return result
+
+    def upload_queue_size(self):
+        """Get upload_queue_size.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Initialize key variables
+        key = 'pattoo-os-actived'
+        sub_key = 'upload_queue_size'
+
+        # Get result
+        intermediate = _key_sub_key(key, sub_key, self._config_dict, die=False)
+        if intermediate is None:
+            result = 10
+        else:
+            result = int(intermediate)
+        return result
+
+    def runtime(self):
+        """Get runtime.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Initialize key variables
+        key = 'pattoo-os-actived'
+        sub_key = 'runtime'
 
         # Get result
         result = _key_sub_key(key, sub_key, self._config_dict, die=False)
         if result is None:
-            result = False
+            result = 'threads'
+        return result
+
+    def sample_interval(self):
+        """Get sample_interval.
+
+        Args:
+            None
+
+        Returns:
+            result: result
+
+        """
+        # Initialize key variables
+        key = 'pattoo-os-actived'
+        sub_key = 'sample_interval'
+
+        # Get result. Default to 0, which disables sampling
+        intermediate = _key_sub_key(key, sub_key, self._config_dict, die=False)
+        if intermediate is None:
+            result = 0
+        else:
+            result = float(intermediate)
         return result
 
     def api_server_uri(self):
@@ -338,6 +982,45 @@ class Config(object):
             result = 20
         return result
 
+    def collectors(self):
+        """Get collectors.
+
+        Args:
+            None
+
+        Returns:
+            result: dict of collector options keyed by collector name
+
+        """
+        # Get result
+        key = 'collectors'
+        result = self._config_dict.get(key)
+
+        # Default to no options
+        if result is None:
+            result = {}
+        return result
+
+    def filters(self):
+        """Get filters.
+
+        Args:
+            None
+
+        Returns:
+            result: dict of include and exclude rules keyed by type of
+                source
+
+        """
+        # Get result
+        key = 'filters'
+        result = self._config_dict.get(key)
+
+        # Default to no rules
+        if result is None:
+            result = {}
+        return result
+
     def agents(self):
         """Get agents.
 
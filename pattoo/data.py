@@ -9,11 +9,11 @@ Description:
 """
 # Standard libraries
 import os
-import re
 import platform
 from collections import defaultdict
-from copy import deepcopy
+from copy import copy
 from random import random
+import threading
 import time
 import socket
 import distro
@@ -26,6 +26,133 @@ from pattoo import language
 from pattoo import log
 from pattoo import general
 from pattoo import daemon
+from pattoo import cgroups
+from pattoo import collectors
+from pattoo import filters
+from pattoo import inventory
+from pattoo import percpu
+from pattoo import procfs
+from pattoo import processes
+from pattoo import rates
+from pattoo import usage
+from pattoo.pattoo import CONFIG
+
+
+class _TimeFixed(object):
+    """Cache of system values that almost never change between polls."""
+
+    def __init__(self):
+        """Initialize the class.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._values = {}
+        self._expiry = 0
+        self._lock = threading.Lock()
+
+    def values(self):
+        """Return the cached values, refreshing them if they have expired.
+
+        Args:
+            None
+
+        Returns:
+            result: Dict of values keyed by label
+
+        """
+        # Only one collector thread should refresh at a time
+        with self._lock:
+            if time.monotonic() >= self._expiry:
+                self._values = _timefixed_values()
+                self._expiry = time.monotonic() + CONFIG.timefixed_ttl()
+            result = self._values
+        return result
+
+    def expire(self):
+        """Force the values to be refreshed on the next poll.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # This is called from a signal handler, so don't take the lock
+        self._expiry = 0
+
+
+class Series(object):
+    """A single label's data for all of its sources.
+
+    Sources and values are held in parallel sequences instead of a list
+    of [source, value] pairs. Series are picklable so that snapshots can
+    be cheaply held in memory or passed between processes.
+
+    """
+
+    __slots__ = ('label', 'base_type', 'description', 'sources', 'values')
+
+    def __init__(self, label, base_type, description, sources, values):
+        """Initialize the class.
+
+        Args:
+            label: Agent label for data
+            base_type: SNMP style base_type. None if not timeseries data
+            description: Description of the label
+            sources: Sequence of sources
+            values: Sequence of values, one per source
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self.label = label
+        self.base_type = base_type
+        self.description = description
+        self.sources = sources
+        self.values = values
+
+    def timeseries(self):
+        """Determine whether the series is timeseries data.
+
+        Args:
+            None
+
+        Returns:
+            result: True if timeseries
+
+        """
+        # Return
+        result = self.base_type is not None
+        return result
+
+    def data(self):
+        """Return the series in the format described in DATA.md.
+
+        Args:
+            None
+
+        Returns:
+            result: dict
+
+        """
+        # Return
+        result = {
+            'base_type': self.base_type,
+            'data': [
+                [source, value] for source, value in zip(
+                    self.sources, self.values)],
+            'description': self.description
+        }
+        return result
 
 
 class _Data(object):
@@ -42,21 +169,16 @@ class _Data(object):
 
         """
         # Initialize key variables
-        self._data = defaultdict(lambda: defaultdict(dict))
-        agent_name = config.agent_name()
-        agent_id = get_agent_id(config)
-        self._lang = language.Agent(agent_name)
+        self._agent_name = config.agent_name()
+        self._agent_id = get_agent_id(config)
+        self._lang = language.Agent(self._agent_name)
+        self._series = {}
 
         # Get devicename
         self._devicename = socket.getfqdn()
 
         # Add timestamp
-        self._data['timestamp'] = general.normalized_timestamp()
-        self._data['agent_id'] = agent_id
-        self._data['agent_program'] = agent_name
-        self._data['agent_hostname'] = self._devicename
-        self._data['devices'] = defaultdict(
-            lambda: defaultdict(lambda: defaultdict(lambda: defaultdict())))
+        self._timestamp = general.normalized_timestamp()
 
     def name(self):
         """Return the name of the _data.
@@ -69,39 +191,67 @@ class _Data(object):
 
         """
         # Return
-        value = self._data['agent_program']
+        value = self._agent_name
         return value
 
-    def populate(self, data_in):
-        """Populate data for agent to eventually send to server.
+    def add(self, label, base_type, sources, values, description=None):
+        """Add a series of data for agent to eventually send to server.
+
+        The sequences are not copied. The caller must not modify them
+        afterwards.
+
+        Args:
+            label: Agent label for data
+            base_type: SNMP style base_type. None if not timeseries data
+            sources: Sequence of sources
+            values: Sequence of values, one per source
+            description: Description of the label. Read from the language
+                file if None
+
+        Returns:
+            None
+
+        """
+        # Add the series with its description
+        if description is None:
+            description = self._lang.label_description(label)
+        self._series[label] = Series(
+            label, base_type, description, sources, values)
+
+    def remove(self, label):
+        """Remove a series of data.
 
         Args:
-            data_in: dict of datapoint values from agent
-            timeseries: TimeSeries data if True
+            label: Agent label for data
 
         Returns:
             None
 
         """
-        # Initialize data
-        data = deepcopy(data_in)
+        # Remove
+        self._series.pop(label, None)
+
+    def populate(self, data):
+        """Populate data for agent to eventually send to server.
+
+        Args:
+            data: dict of datapoint values from agent keyed by label
 
+        Returns:
+            None
+
+        """
         # Validate base_type
-        if len(data) != 1 or isinstance(data, defaultdict) is False:
+        if len(data) != 1 or isinstance(data, dict) is False:
             log_message = 'Agent data "{}" is invalid'.format(data)
             log.log2die(1025, log_message)
 
-        # Get a description to use for label value
-        for label in data.keys():
-            description = self._lang.label_description(label)
-            data[label]['description'] = description
-            break
-
-        # Add data to appropriate self._data key
-        if data[label]['base_type'] is not None:
-            self._data['devices'][self._devicename]['timeseries'].update(data)
-        else:
-            self._data['devices'][self._devicename]['timefixed'].update(data)
+        # Add data
+        for label, values in data.items():
+            self.add(
+                label, values['base_type'],
+                [pair[0] for pair in values['data']],
+                [pair[1] for pair in values['data']])
 
     def populate_single(self, label, value, base_type=None, source=None):
         """Populate a single value in the _data.
@@ -116,13 +266,8 @@ class _Data(object):
             None
 
         """
-        # Initialize key variables
-        data = defaultdict(lambda: defaultdict(dict))
-        data[label]['base_type'] = base_type
-        data[label]['data'] = [[source, value]]
-
         # Update
-        self.populate(data)
+        self.add(label, base_type, (source,), (value,))
 
     def populate_named_tuple(self, prefix, named_tuple, base_type=1):
         """Post system data to the central server.
@@ -136,30 +281,18 @@ class _Data(object):
             None
 
         """
-        # Get data
-        system_dict = named_tuple._asdict()
-        return_data = defaultdict(lambda: defaultdict(dict))
-        data = []
-
         # Do nothing if there is no prefix
         if bool(prefix) is False:
             return
 
-        # Cycle through results
-        for label, value in system_dict.items():
-            # Convert the dict to list of lists [label][value]
-            data.append([label, value])
-
-        # Add data
-        return_data[prefix]['data'] = data
-        return_data[prefix]['base_type'] = base_type
-
-        # Update
-        self.populate(return_data)
+        # Update. The field names are the sources
+        self.add(prefix, base_type, named_tuple._fields, tuple(named_tuple))
 
     def populate_dict(self, prefix, data_in, base_type=1):
         """Populate agent with data that's a dict keyed by [label][source].
 
+        The data is not copied or modified.
+
         Args:
             prefix: Prefix to append to data keys when populating the agent
             data_in: Dict of data to post "X[label][source] = value"
@@ -169,29 +302,59 @@ class _Data(object):
             None
 
         """
-        # Initialize data
-        data_input = deepcopy(data_in)
-
         # Iterate over labels
-        for label in data_input.keys():
-            # Initialize tuple list to use by _data.populate
-            value_sources = []
-            new_label = '{}_{}'.format(prefix, label)
+        for label, sources in data_in.items():
+            # (Sorting is important to keep consistent ordering)
+            items = sorted(sources.items())
+            self.add(
+                '{}_{}'.format(prefix, label), base_type,
+                [item[0] for item in items], [item[1] for item in items])
 
-            # Initialize data
-            data = defaultdict(lambda: defaultdict(dict))
-            data[new_label]['base_type'] = base_type
+    def subset(self):
+        """Create an empty _Data object sharing this object's metadata.
 
-            # Append to tuple list
-            # (Sorting is important to keep consistent ordering)
-            for source, value in sorted(data_input[label].items()):
-                value_sources.append(
-                    [source, value]
-                )
-            data[new_label]['data'] = value_sources
+        Collectors running in parallel each populate their own subset so
+        that a collector that times out can never modify the snapshot
+        after it has been returned.
+
+        Args:
+            None
+
+        Returns:
+            result: _Data object
+
+        """
+        # Share the language and device metadata, but not the series
+        result = copy(self)
+        result._series = {}
+        return result
+
+    def merge(self, _subset):
+        """Merge the data from a subset into this object.
+
+        Args:
+            _subset: _Data object created by self.subset()
+
+        Returns:
+            None
+
+        """
+        # Update
+        self._series.update(_subset._series)
+
+    def series(self):
+        """Return the series that have been populated.
+
+        Args:
+            None
 
-            # Update
-            self.populate(data)
+        Returns:
+            result: List of Series objects
+
+        """
+        # Return
+        result = list(self._series.values())
+        return result
 
     def data(self):
         """Return that that should be posted.
@@ -200,20 +363,42 @@ class _Data(object):
             None
 
         Returns:
-            None
+            result: dict in the format described in DATA.md
 
         """
+        # Sort the series into timefixed and timeseries data
+        device = {}
+        for item in self._series.values():
+            if item.timeseries() is True:
+                category = 'timeseries'
+            else:
+                category = 'timefixed'
+            device.setdefault(category, {})[item.label] = item.data()
+
         # Return
-        return self._data
+        result = {
+            'timestamp': self._timestamp,
+            'agent_id': self._agent_id,
+            'agent_program': self._agent_name,
+            'agent_hostname': self._devicename,
+            'devices': {self._devicename: device}
+        }
+        return result
 
 
-def poll(config):
+def poll(config, sampler=None, overhead=None, breaker=None):
     """Get all agent data.
 
     Performance data on linux server on which this application is installed.
 
     Args:
         config: ConfigAgent object
+        sampler: pattoo.sampler.Sampler object whose aggregates should be
+            added to the data
+        overhead: pattoo.overhead.Overhead object whose aggregates should be
+            added to the data
+        breaker: pattoo.breaker.Breaker object whose state should be added
+            to the data
 
     Returns:
         None
@@ -222,14 +407,31 @@ def poll(config):
     # Intialize data gathering
     data = _Data(config)
 
-    # Update agent with system data
-    _get_data_system(data)
+    # Update agent with the latest data from each collector
+    _COLLECTORS.configure(config)
+    _COLLECTORS.collect(
+        data, config.poll_timeout(), config.interval(),
+        metrics=config.collector_metrics())
 
-    # Update agent with disk data
-    _get_data_storage(data)
+    # Update agent with aggregates of samples taken since the last poll
+    if sampler is not None:
+        for label, sources, values in sampler.aggregates():
+            data.add(label, 1, sources, values)
 
-    # Update agent with network data
-    _get_data_network(data)
+    # Update agent with the costs of its most recent cycles
+    if overhead is not None:
+        for label, sources, values in overhead.aggregates():
+            data.add(label, 1, sources, values)
+
+    # Update agent with the state of the circuit breaker for the server
+    if breaker is not None:
+        for label, base_type, sources, values in breaker.aggregates():
+            data.add(label, base_type, sources, values)
+
+    # Convert counters to rates
+    counter_mode = config.counter_mode()
+    if counter_mode in ['rate', 'both']:
+        _RATES.convert(data, keep=counter_mode == 'both')
 
     #
     result = data.data()
@@ -249,22 +451,25 @@ def _get_data_system(_data):
     #########################################################################
     # Set non timeseries values
     #########################################################################
-
-    _data.populate_single('release', platform.release(), base_type=None)
-    _data.populate_single('system', platform.system(), base_type=None)
-    _data.populate_single('version', platform.version(), base_type=None)
-    dist = distro.linux_distribution()
-    _data.populate_single('distribution', ' '.join(dist), base_type=None)
-    _data.populate_single('cpu_count', psutil.cpu_count(), base_type=1)
+    values = _TIMEFIXED.values()
+    _data.populate_single('release', values['release'], base_type=None)
+    _data.populate_single('system', values['system'], base_type=None)
+    _data.populate_single('version', values['version'], base_type=None)
+    _data.populate_single(
+        'distribution', values['distribution'], base_type=None)
+    _data.populate_single('cpu_count', values['cpu_count'], base_type=1)
 
     #########################################################################
     # Set timeseries values
     #########################################################################
+    _backend = backend()
     _data.populate_single(
-        'process_count', len(psutil.pids()), base_type=1)
+        'process_count', len(_backend.pids()), base_type=1)
 
+    # Get CPU times and calculate percentages since the previous poll
+    cpu_times = _backend.cpu_times()
     _data.populate_named_tuple(
-        'cpu_times_percent', psutil.cpu_times_percent(), base_type=1)
+        'cpu_times_percent', _cpu_times_percent(cpu_times), base_type=1)
 
     # Load averages
     (la_01, la_05, la_15) = os.getloadavg()
@@ -277,14 +482,109 @@ def _get_data_system(_data):
 
     # Get CPU times
     _data.populate_named_tuple(
-        'cpu_times', psutil.cpu_times(), base_type=64)
+        'cpu_times', cpu_times, base_type=64)
 
     # Get CPU stats
     _data.populate_named_tuple(
-        'cpu_stats', psutil.cpu_stats(), base_type=64)
+        'cpu_stats', _backend.cpu_stats(), base_type=64)
 
     # Get memory utilization
-    _data.populate_named_tuple('memory', psutil.virtual_memory())
+    _data.populate_named_tuple('memory', _backend.virtual_memory())
+
+
+def _cpu_times_percent(cpu_times):
+    """Calculate CPU time percentages since the previous poll.
+
+    psutil keeps its previous CPU times per thread, which doesn't work
+    when collectors run on different threads of a pool from one poll to
+    the next. The same calculation is done here instead.
+
+    Args:
+        cpu_times: Current CPU times named tuple
+
+    Returns:
+        result: Named tuple of CPU time percentages
+
+    """
+    # Use the current times if there is no previous poll
+    global _LAST_CPU_TIMES
+    previous = _LAST_CPU_TIMES
+    if previous is None or previous._fields != cpu_times._fields:
+        previous = cpu_times
+    _LAST_CPU_TIMES = cpu_times
+
+    # Guest time is already included in user time
+    deltas = [max(0, now - then) for now, then in zip(cpu_times, previous)]
+    total = sum(deltas)
+    for field in ('guest', 'guest_nice'):
+        if field in cpu_times._fields:
+            total -= deltas[cpu_times._fields.index(field)]
+
+    # Return
+    scale = 100.0 / max(1, total)
+    result = type(cpu_times)(
+        *[min(max(0.0, round(delta * scale, 1)), 100.0) for delta in deltas])
+    return result
+
+
+def backend():
+    """Get the configured collector backend.
+
+    Args:
+        None
+
+    Returns:
+        result: psutil or pattoo.procfs module
+
+    """
+    # Return
+    if CONFIG.collector_backend() == 'native':
+        result = procfs
+    else:
+        result = psutil
+    return result
+
+
+def _timefixed_values():
+    """Read the system values that almost never change.
+
+    Args:
+        None
+
+    Returns:
+        result: Dict of values keyed by label
+
+    """
+    # Get the values. distro can spawn a subprocess, so do this rarely
+    dist = distro.linux_distribution()
+    result = {
+        'release': platform.release(),
+        'system': platform.system(),
+        'version': platform.version(),
+        'distribution': ' '.join(dist),
+        'cpu_count': psutil.cpu_count()
+    }
+    return result
+
+
+def refresh_timefixed(signum=None, frame=None):
+    """Refresh the cached timefixed values.
+
+    Usable as a signal handler, in which case the values are refreshed
+    at the next poll.
+
+    Args:
+        signum: Signal number
+        frame: Current stack frame
+
+    Returns:
+        None
+
+    """
+    # Read the values now if not called from a signal handler
+    _TIMEFIXED.expire()
+    if signum is None:
+        _TIMEFIXED.values()
 
 
 def _get_data_storage(_data):
@@ -297,13 +597,11 @@ def _get_data_storage(_data):
         None
 
     """
-    # Initialize key variables
-    regex = re.compile(r'^ram\d+$')
-
     # Get swap utilization
+    _backend = backend()
     multikey = defaultdict(lambda: defaultdict(dict))
     counterkey = defaultdict(lambda: defaultdict(dict))
-    swap_data = psutil.swap_memory()
+    swap_data = _backend.swap_memory()
     system_list = swap_data._asdict()
     # "label" is named tuple describing partitions
     for label in system_list:
@@ -316,28 +614,29 @@ def _get_data_storage(_data):
     _data.populate_dict('swap', counterkey, base_type=64)
 
     # Get filesystem partition utilization
-    disk_data = psutil.disk_partitions()
+    disk_data = _MOUNTS.mounts()
+    usage_data = _DISK_USAGE.usage(disk_data, CONFIG.disk_usage_timeout())
     multikey = defaultdict(lambda: defaultdict(dict))
-    # "disk" is named tuple describing partitions
-    for disk in disk_data:
-        # "source" is the partition mount point
-        source = disk.mountpoint
-        if "docker" in str(source):
-            pass
-        else:
-            system_data = psutil.disk_usage(source)
-            system_dict = system_data._asdict()
-            for label, value in system_dict.items():
-                multikey[label][source] = value
+    # "source" is the partition mount point
+    for source, system_data in usage_data.items():
+        system_dict = system_data._asdict()
+        for label, value in system_dict.items():
+            multikey[label][source] = value
     _data.populate_dict('disk_usage', multikey)
 
+    # Report network filesystems that aren't responding
+    _data.populate_dict('pattoo_agent_disk_usage', {
+        'quarantined': {
+            source: 1 for source in _DISK_USAGE.quarantined()} or {None: 0}
+    })
+
     # Get disk I/O usage
-    io_data = psutil.disk_io_counters(perdisk=True)
+    io_data = _backend.disk_io_counters(perdisk=True)
     counterkey = defaultdict(lambda: defaultdict(dict))
     # "source" is disk name
     for source in io_data.keys():
-        # No RAM pseudo disks. RAM disks OK.
-        if bool(regex.match(source)) is True:
+        # No RAM pseudo disks by default. RAM disks OK.
+        if _FILTERS['disks'].allowed(source) is False:
             continue
         system_data = io_data[source]
         system_dict = system_data._asdict()
@@ -357,10 +656,13 @@ def _get_data_network(_data):
 
     """
     # Get network utilization
-    nic_data = psutil.net_io_counters(pernic=True)
+    nic_data = backend().net_io_counters(pernic=True)
     counterkey = defaultdict(lambda: defaultdict(dict))
+    interfaces = _INTERFACES.interfaces(nic_data.keys())
     for source in nic_data.keys():
         # "source" is nic name
+        if source not in interfaces:
+            continue
         system_data = nic_data[source]
         system_dict = system_data._asdict()
         for label, value in system_dict.items():
@@ -368,6 +670,119 @@ def _get_data_network(_data):
     _data.populate_dict('network', counterkey, base_type=64)
 
 
+def _get_data_processes(_data):
+    """Update agent with data for the processes using the most CPU.
+
+    Args:
+        _data: Data object
+
+    Returns:
+        None
+
+    """
+    # Do nothing if not configured
+    count = CONFIG.process_top()
+    if bool(count) is False:
+        return
+
+    # Get the top processes
+    (top, scanned, seconds) = _PROCESSES.top(count)
+    gauges = defaultdict(dict)
+    counters = defaultdict(dict)
+    for sample in top:
+        source = sample.source()
+        gauges['cpu_percent'][source] = sample.cpu_percent
+        gauges['memory_rss'][source] = sample.rss
+        if sample.read_bytes is not None:
+            counters['io_read_bytes'][source] = sample.read_bytes
+            counters['io_write_bytes'][source] = sample.write_bytes
+    _data.populate_dict('process', gauges)
+    _data.populate_dict('process', counters, base_type=64)
+
+    # Report the cost of collecting the data
+    _data.populate_dict('pattoo_agent_processes', {
+        'scanned': {None: scanned},
+        'scan_seconds': {None: round(seconds, 6)}
+    })
+
+
+def _get_data_cgroups(_data):
+    """Update agent with cgroup data.
+
+    Args:
+        _data: Data object
+
+    Returns:
+        None
+
+    """
+    # Do nothing if not configured
+    if CONFIG.cgroups() is False:
+        return
+
+    # Get cgroup data keyed by cgroup path
+    (gauges, counters) = _CGROUPS.metrics()
+    _data.populate_dict('cgroup', gauges)
+    _data.populate_dict('cgroup', counters, base_type=64)
+
+
+def _get_data_percpu(_data):
+    """Update agent with the utilization of each CPU.
+
+    Args:
+        _data: Data object
+
+    Returns:
+        None
+
+    """
+    # Do nothing if not configured
+    if CONFIG.percpu() is False:
+        return
+
+    # Add one series per CPU time field, with a value for each CPU
+    for field, sources, values in _PERCPU.percent(backend()):
+        _data.add('cpu_core_percent_{}'.format(field), 1, sources, values)
+
+
+# The CPU times from the previous poll
+_LAST_CPU_TIMES = None
+
+# Include and exclude rules for sources, compiled once
+_FILTERS = filters.filters(CONFIG)
+
+# Mounts and network interfaces to report, refreshed only when they change
+_MOUNTS = inventory.Mounts(_FILTERS['mounts'])
+_INTERFACES = inventory.Interfaces(_FILTERS['interfaces'])
+
+# Filesystem usage that can't be blocked by hung network filesystems
+_DISK_USAGE = usage.DiskUsage()
+
+# Cache of cgroup directories
+_CGROUPS = cgroups.Cgroups()
+
+# The per-CPU times from the previous poll
+_PERCPU = percpu.PerCpu()
+
+# Processes read by the previous poll
+_PROCESSES = processes.Processes()
+
+# Counter values from the previous poll used to calculate rates
+_RATES = rates.Rates()
+
+# Cache of timefixed values shared by all polls
+_TIMEFIXED = _TimeFixed()
+
+# Collectors run by poll() with their timeouts in seconds
+_COLLECTORS = collectors.Registry()
+_COLLECTORS.register('system', _get_data_system, timeout=10)
+_COLLECTORS.register('percpu', _get_data_percpu, timeout=10)
+_COLLECTORS.register('storage', _get_data_storage, timeout=20)
+_COLLECTORS.register('network', _get_data_network, timeout=10)
+_COLLECTORS.register('processes', _get_data_processes, timeout=20)
+_COLLECTORS.register('cgroups', _get_data_cgroups, timeout=20)
+
+
 def get_agent_id(config):
     """Create a permanent UID for the _data.
 
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""Pattoo drain of spooled data.
+
+Description:
+
+    This module:
+        1) Posts spooled data in background threads, so that a large
+           backlog doesn't delay the next poll
+        2) Limits the number of concurrent posts with a bounded pool of
+           worker threads
+        3) Limits the rate of posts with a token bucket, so that many
+           agents recovering from an outage don't overwhelm the server
+        4) Stops at the first failed post. The spool records each post as
+           it is acknowledged, so the next drain resumes where this one
+           stopped, even after a restart
+
+"""
+# Standard libraries
+import queue
+import threading
+import time
+
+# Pattoo libraries
+from pattoo import log
+
+# Drains keyed by spool directory, shared by all posts
+_DRAINS = {}
+_LOCK = threading.Lock()
+
+
+class TokenBucket(object):
+    """Token bucket rate limit."""
+
+    def __init__(self, rate, burst=1):
+        """Initialize the class.
+
+        Args:
+            rate: Tokens added per second. No limit if 0
+            burst: Maximum number of tokens that can be saved up
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._rate = max(float(rate), 0)
+        self._burst = max(int(burst), 1)
+        self._tokens = float(self._burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, stop):
+        """Wait for a token.
+
+        Args:
+            stop: threading.Event that ends the wait when set
+
+        Returns:
+            result: True if a token was taken. False if stopped
+
+        """
+        # Wait for the next token
+        while stop.is_set() is False:
+            delay = self.delay()
+            if bool(delay) is False:
+                return True
+            stop.wait(delay)
+        return False
+
+    def delay(self):
+        """Take a token if one is available.
+
+        Args:
+            None
+
+        Returns:
+            result: 0 if a token was taken. Otherwise the seconds until the
+                next token is available
+
+        """
+        # There is no limit
+        if bool(self._rate) is False:
+            return 0
+
+        # Add the tokens earned since the last update
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self._burst,
+                self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                result = 0
+            else:
+                result = (1 - self._tokens) / self._rate
+        return result
+
+
+class Drain(object):
+    """Background posting of spooled data."""
+
+    def __init__(self, workers=1, rate=0, burst=1):
+        """Initialize the class.
+
+        Args:
+            workers: Maximum number of concurrent posts
+            rate: Maximum number of posts per second. No limit if 0
+            burst: Number of posts that can exceed the rate at once
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._workers = max(int(workers), 1)
+        self._bucket = TokenBucket(rate, burst)
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def start(self, units, send):
+        """Start posting in the background unless already doing so.
+
+        Args:
+            units: List of the units of work to post, in order
+            send: Function that posts a unit of work. It returns True if
+                the unit was posted
+
+        Returns:
+            result: True if started
+
+        """
+        # Initialize key variables
+        result = False
+
+        with self._lock:
+            if self.running() is True or bool(units) is False:
+                return result
+
+            # Share the work between the workers
+            work = queue.Queue()
+            for unit in units:
+                work.put(unit)
+            stop = threading.Event()
+            posted = []
+            started = time.monotonic()
+            self._threads = [
+                threading.Thread(
+                    target=self._work, args=(work, send, stop, posted),
+                    daemon=True)
+                for _ in range(min(self._workers, len(units)))]
+            for thread in self._threads:
+                thread.start()
+
+            # Log the outcome when all the workers are done
+            threading.Thread(
+                target=self._report,
+                args=(list(self._threads), len(units), posted, started),
+                daemon=True).start()
+            result = True
+        return result
+
+    def running(self):
+        """Determine whether posting is in progress.
+
+        Args:
+            None
+
+        Returns:
+            result: True if any worker is running
+
+        """
+        # Return
+        result = any(thread.is_alive() for thread in self._threads)
+        return result
+
+    def join(self, timeout=None):
+        """Wait for posting to finish.
+
+        Args:
+            timeout: Seconds to wait for each worker. Wait forever if None
+
+        Returns:
+            None
+
+        """
+        # Wait
+        for thread in list(self._threads):
+            thread.join(timeout)
+
+    def _work(self, work, send, stop, posted):
+        """Post units of work until there are none left or a post fails.
+
+        Args:
+            work: queue.Queue of units of work
+            send: Function that posts a unit of work
+            stop: threading.Event set when a post fails
+            posted: List of the units that were posted
+
+        Returns:
+            None
+
+        """
+        # Post
+        while self._bucket.take(stop) is True:
+            try:
+                unit = work.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                success = send(unit)
+            except Exception as error:
+                log_message = (
+                    'Failed to post spooled data: {}'.format(error))
+                log.log2warning(1051, log_message)
+                success = False
+
+            # Leave the rest for the next drain if the server is unavailable
+            if success is True:
+                posted.append(unit)
+            else:
+                stop.set()
+
+    def _report(self, threads, total, posted, started):
+        """Log the outcome of a drain.
+
+        Args:
+            threads: Worker threads of the drain
+            total: Number of units of work
+            posted: List of the units that were posted
+            started: time.monotonic() when the drain started
+
+        Returns:
+            None
+
+        """
+        # Wait for the workers
+        for thread in threads:
+            thread.join()
+
+        # Log
+        report(total, len(posted), time.monotonic() - started)
+
+
+def report(total, posted, seconds):
+    """Log the outcome of a drain.
+
+    Args:
+        total: Number of units of work
+        posted: Number of units that were posted
+        seconds: Duration of the drain
+
+    Returns:
+        None
+
+    """
+    # Log
+    log_message = (
+        'Posted {} of {} units of spooled data in {:.3f} seconds'
+        ''.format(posted, total, seconds))
+    log.log2info(1052, log_message)
+
+
+def drain(directory, config):
+    """Get the shared drain for a spool directory.
+
+    Args:
+        directory: Directory of the spool
+        config: ConfigAgent object
+
+    Returns:
+        result: Drain object
+
+    """
+    # Create the drain only once
+    with _LOCK:
+        if directory not in _DRAINS:
+            _DRAINS[directory] = Drain(
+                workers=config.api_drain_workers(),
+                rate=config.api_drain_rate(),
+                burst=config.api_drain_burst())
+        result = _DRAINS[directory]
+    return result
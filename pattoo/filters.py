@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Pattoo source filters.
+
+Description:
+
+    This module:
+        1) Compiles the include and exclude rules of the "filters"
+           configuration once at startup
+        2) Splits the rules into a set of exact names and a single combined
+           regular expression, so that each source is checked with at most
+           one set lookup and one regular expression match
+
+"""
+# Standard libraries
+import re
+
+# Pattoo libraries
+from pattoo import log
+
+# Rules used when a type of source has no "filters" configuration. They
+# skip RAM pseudo disks and Docker mounts
+_DEFAULTS = {
+    'disks': {'exclude': [r'ram\d+']},
+    'mounts': {'exclude': [r'.*docker.*']},
+    'interfaces': {},
+}
+
+
+class _Rules(object):
+    """A compiled list of rules."""
+
+    def __init__(self, rules):
+        """Initialize the class.
+
+        Args:
+            rules: List of source names or regular expressions. Regular
+                expressions must match the whole source name
+
+        Returns:
+            None
+
+        """
+        # Names without regular expression characters are matched exactly
+        self.exact = set(
+            rule for rule in rules if re.escape(rule) == rule)
+        patterns = [
+            '(?:{})'.format(rule) for rule in rules if rule not in self.exact]
+        if bool(patterns) is True:
+            self.regex = re.compile('|'.join(patterns))
+        else:
+            self.regex = None
+        self.empty = bool(rules) is False
+
+    def match(self, source):
+        """Determine whether a source matches any rule.
+
+        Args:
+            source: Source name
+
+        Returns:
+            result: True if matched
+
+        """
+        # Return
+        result = source in self.exact or (
+            self.regex is not None and
+            self.regex.fullmatch(source) is not None)
+        return result
+
+
+class Filter(object):
+    """Include and exclude rules for one type of source."""
+
+    def __init__(self, include=None, exclude=None):
+        """Initialize the class.
+
+        Args:
+            include: List of rules for sources to report. All sources are
+                reported if empty
+            exclude: List of rules for sources to skip. These override the
+                include rules
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._include = _Rules(include or [])
+        self._exclude = _Rules(exclude or [])
+
+    def allowed(self, source):
+        """Determine whether a source should be reported.
+
+        Args:
+            source: Source name
+
+        Returns:
+            result: True if the source should be reported
+
+        """
+        # Return
+        source = str(source)
+        if self._exclude.match(source) is True:
+            result = False
+        elif self._include.empty is True:
+            result = True
+        else:
+            result = self._include.match(source)
+        return result
+
+
+def filters(config):
+    """Compile the "filters" configuration.
+
+    Args:
+        config: Config object
+
+    Returns:
+        result: Dict of Filter objects keyed by type of source. The types
+            are "disks", "mounts" and "interfaces"
+
+    """
+    # Initialize key variables
+    result = {}
+    options = config.filters()
+
+    for name, default in _DEFAULTS.items():
+        rules = options.get(name) or default
+        try:
+            result[name] = Filter(
+                include=rules.get('include'), exclude=rules.get('exclude'))
+        except (re.error, AttributeError, TypeError) as error:
+            log_message = (
+                'Invalid "{}" filters in the configuration. Using the '
+                'defaults: {}'.format(name, error))
+            log.log2warning(1040, log_message)
+            result[name] = Filter(**default)
+    return result
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""Pattoo mount table and interface list.
+
+Description:
+
+    This module:
+        1) Caches the mounts to report, and refreshes them only when the
+           kernel signals a change to /proc/self/mountinfo
+        2) Keeps one mount per filesystem, so that bind mounts of the same
+           filesystem don't have their usage read many times
+        3) Caches the network interfaces to report, and refreshes them only
+           when /sys/class/net changes
+
+"""
+# Standard libraries
+import os
+import select
+import threading
+
+# pip3 libraries
+import psutil
+
+# Pattoo libraries
+from pattoo import usage
+
+# Files that change when mounts and interfaces change
+_MOUNTINFO = '/proc/self/mountinfo'
+_SYS_CLASS_NET = '/sys/class/net'
+
+
+class Mounts(object):
+    """Cache of the mounts to report."""
+
+    def __init__(self, _filter):
+        """Initialize the class.
+
+        Args:
+            _filter: pattoo.filters.Filter object for mount points
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._filter = _filter
+        self._mounts = None
+        self._fd = None
+        self._poll = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def mounts(self):
+        """Get the mounts to report.
+
+        Args:
+            None
+
+        Returns:
+            result: List of psutil disk partition named tuples
+
+        """
+        # Refresh the mounts if they have changed
+        with self._lock:
+            if self._changed() is True or self._mounts is None:
+                self._mounts = self._refresh()
+            result = self._mounts
+        return result
+
+    def _changed(self):
+        """Determine whether the mount table has changed.
+
+        Args:
+            None
+
+        Returns:
+            result: True if changed
+
+        """
+        # Open mountinfo on first use, and again after the daemon forks,
+        # so that processes never share the descriptor. Changes made
+        # before it was opened aren't signalled
+        if self._pid != os.getpid():
+            self._open()
+            result = True
+
+        # Polling clears the event until the next change
+        elif self._poll is None:
+            result = True
+        else:
+            result = bool(self._poll.poll(0))
+        return result
+
+    def _open(self):
+        """Open /proc/self/mountinfo to be notified of changes.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Close the descriptor inherited from the parent process
+        if self._fd is not None:
+            os.close(self._fd)
+        self._pid = os.getpid()
+
+        # The kernel sets POLLPRI on mountinfo whenever a filesystem is
+        # mounted or unmounted. Poll every time if this isn't possible
+        try:
+            self._fd = os.open(_MOUNTINFO, os.O_RDONLY | os.O_CLOEXEC)
+            self._poll = select.poll()
+            self._poll.register(self._fd, select.POLLPRI)
+        except (OSError, AttributeError):
+            self._fd = None
+            self._poll = None
+
+    def _refresh(self):
+        """Read the mount table.
+
+        Args:
+            None
+
+        Returns:
+            result: List of psutil disk partition named tuples
+
+        """
+        # Initialize key variables
+        result = []
+        devices = set()
+
+        for partition in psutil.disk_partitions():
+            # Skip mounts that aren't required before reading anything else
+            if self._filter.allowed(partition.mountpoint) is False:
+                continue
+
+            # Only keep the first mount of each filesystem. Don't stat
+            # network filesystems as their servers may not respond
+            device = None
+            if usage.remote(partition.fstype) is False:
+                try:
+                    device = os.stat(partition.mountpoint).st_dev
+                except OSError:
+                    pass
+            if device is not None:
+                if device in devices:
+                    continue
+                devices.add(device)
+            result.append(partition)
+        return result
+
+
+class Interfaces(object):
+    """Cache of the network interfaces to report."""
+
+    def __init__(self, _filter):
+        """Initialize the class.
+
+        Args:
+            _filter: pattoo.filters.Filter object for interface names
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._filter = _filter
+        self._mtime = None
+        self._known = frozenset()
+        self._interfaces = frozenset()
+        self._lock = threading.Lock()
+
+    def interfaces(self, names):
+        """Get the network interfaces to report.
+
+        Args:
+            names: Names of the interfaces that currently have counters
+
+        Returns:
+            result: Set of interface names
+
+        """
+        # Refresh if /sys/class/net changed or an unknown interface appeared
+        try:
+            mtime = os.stat(_SYS_CLASS_NET).st_mtime_ns
+        except OSError:
+            mtime = None
+        with self._lock:
+            if (mtime is None or mtime != self._mtime or
+                    self._known.issuperset(names) is False):
+                self._mtime = mtime
+                self._known = frozenset(names)
+                self._interfaces = frozenset(
+                    name for name in names if self._filter.allowed(name))
+            result = self._interfaces
+        return result
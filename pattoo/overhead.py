@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""Pattoo agent overhead accounting.
+
+Description:
+
+    This module:
+        1) Records what each polling cycle costs the agent. This is the
+           resident memory, the CPU time used, the size and number of
+           series of the data, the time taken to post it and the number of
+           cached posts waiting to be sent
+        2) Keeps the costs of the most recent cycles in a fixed size ring
+           buffer
+        3) Reduces the buffer to last, min, max, mean and p95 values that
+           are sent with the data and can be logged on demand
+
+"""
+# Standard libraries
+import threading
+
+# pip3 libraries
+import numpy
+import psutil
+
+# Pattoo libraries
+from pattoo import log
+
+# Costs recorded for each cycle
+_FIELDS = (
+    'rss_bytes', 'cpu_seconds', 'payload_bytes', 'series', 'post_seconds',
+    'spool_depth')
+
+# Statistics calculated for each cost
+_STATISTICS = ('last', 'min', 'max', 'mean', 'p95')
+
+
+class Overhead(object):
+    """Record the costs of the agent's most recent cycles."""
+
+    def __init__(self, capacity=64):
+        """Initialize the class.
+
+        Args:
+            capacity: Number of cycles to keep
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._process = psutil.Process()
+        self._cpu_seconds = _cpu_seconds(self._process)
+        self._requested = False
+        self._lock = threading.Lock()
+
+        # Costs that don't apply to an agent are left as NaN
+        self._buffer = numpy.full((capacity, len(_FIELDS)), numpy.nan)
+        self._count = 0
+        self._position = 0
+
+    def record(self, payload_bytes, series, post_seconds=None,
+               spool_depth=None):
+        """Record the costs of a cycle.
+
+        Args:
+            payload_bytes: Size of the serialized data
+            series: Number of series in the data
+            post_seconds: Seconds taken to post the data. None if the data
+                wasn't posted
+            spool_depth: Number of cached posts waiting to be sent. None if
+                the agent doesn't cache posts
+
+        Returns:
+            None
+
+        """
+        # Get the CPU time used since the previous cycle
+        cpu_seconds = _cpu_seconds(self._process)
+        row = (
+            self._process.memory_info().rss,
+            cpu_seconds - self._cpu_seconds,
+            payload_bytes,
+            series,
+            numpy.nan if post_seconds is None else post_seconds,
+            numpy.nan if spool_depth is None else spool_depth)
+        self._cpu_seconds = cpu_seconds
+
+        # Add to the buffer, overwriting the oldest cycle when full
+        with self._lock:
+            self._buffer[self._position] = row
+            self._position = (self._position + 1) % len(self._buffer)
+            self._count = min(self._count + 1, len(self._buffer))
+
+    def summary(self):
+        """Reduce the costs of the recorded cycles.
+
+        Args:
+            None
+
+        Returns:
+            result: Dict of values keyed by [statistic][cost]. Costs that
+                weren't recorded are left out. The last value of a cost is
+                from the latest cycle that recorded it
+
+        """
+        # Initialize key variables
+        result = {}
+
+        # Get the cycles in the order they were recorded
+        with self._lock:
+            if bool(self._count) is False:
+                return result
+            cycles = numpy.roll(
+                self._buffer, -self._position, axis=0)[-self._count:]
+
+        # Ignore costs that don't apply to a cycle, such as the time taken
+        # to post data that was spooled
+        cycles[~numpy.isfinite(cycles)] = numpy.nan
+        recorded = ~numpy.isnan(cycles).all(axis=0)
+        cycles = cycles[:, recorded]
+        latest = len(cycles) - 1 - numpy.argmax(
+            ~numpy.isnan(cycles[::-1]), axis=0)
+
+        # Reduce all the columns at once
+        statistics = zip(_STATISTICS, (
+            cycles[latest, numpy.arange(cycles.shape[1])],
+            numpy.nanmin(cycles, axis=0),
+            numpy.nanmax(cycles, axis=0),
+            numpy.nanmean(cycles, axis=0),
+            numpy.nanpercentile(cycles, 95, axis=0)))
+        fields = [
+            field for field, keep in zip(_FIELDS, recorded) if keep]
+        for name, values in statistics:
+            result[name] = dict(zip(
+                fields, [round(value, 6) for value in values.tolist()]))
+        return result
+
+    def aggregates(self):
+        """Get the costs of the recorded cycles as agent data.
+
+        Args:
+            None
+
+        Returns:
+            result: List of (label, sources, values) tuples. Labels are
+                "pattoo_agent_overhead_" suffixed with the name of the
+                statistic, and sources are the names of the costs
+
+        """
+        # Initialize key variables
+        result = []
+        summary = self.summary()
+
+        # Log the costs if a signal asked for them
+        if self._requested is True:
+            self._requested = False
+            _log(summary)
+
+        # Return
+        for name, values in summary.items():
+            result.append((
+                'pattoo_agent_overhead_{}'.format(name),
+                list(values.keys()), list(values.values())))
+        return result
+
+    def log(self, signum=None, frame=None):
+        """Log the costs of the recorded cycles.
+
+        Usable as a signal handler to report the costs on demand, in which
+        case they are logged by the next call to aggregates().
+
+        Args:
+            signum: Signal number
+            frame: Current stack frame
+
+        Returns:
+            None
+
+        """
+        # The signal may interrupt a thread holding the lock, so don't take
+        # it from a signal handler
+        if signum is None:
+            _log(self.summary())
+        else:
+            self._requested = True
+
+
+def series(data_dict):
+    """Count the series in agent data.
+
+    Args:
+        data_dict: Agent data dict
+
+    Returns:
+        result: Number of series
+
+    """
+    # Return
+    result = 0
+    for device in data_dict.get('devices', {}).values():
+        for values in device.values():
+            result += len(values)
+    return result
+
+
+def _log(summary):
+    """Log the costs of the recorded cycles.
+
+    Args:
+        summary: Dict of costs from Overhead.summary()
+
+    Returns:
+        None
+
+    """
+    # Log
+    log_message = 'Agent overhead: {}'.format(summary)
+    log.log2info(1044, log_message)
+
+
+def _cpu_seconds(process):
+    """Get the CPU time used by a process.
+
+    Args:
+        process: psutil.Process object
+
+    Returns:
+        result: User and system CPU time in seconds
+
+    """
+    # Return
+    cpu_times = process.cpu_times()
+    result = cpu_times.user + cpu_times.system
+    return result
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Pattoo per-CPU collector.
+
+Description:
+
+    This module:
+        1) Reads the CPU times of every core into a NumPy array
+        2) Calculates the utilization of all cores from the difference to
+           the previous poll in a single vectorized step
+        3) Returns one series per CPU time field with a value for each core,
+           so that the cost stays flat as the number of cores grows
+
+"""
+# Standard libraries
+import threading
+
+# pip3 libraries
+import numpy
+
+# Pattoo libraries
+from pattoo import procfs
+
+# CPU time fields that are already included in "user" and "nice"
+_GUEST_FIELDS = ('guest', 'guest_nice')
+
+
+class PerCpu(object):
+    """Calculate the utilization of each CPU."""
+
+    def __init__(self):
+        """Initialize the class.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._cpu_times = None
+        self._sources = ()
+        self._lock = threading.Lock()
+
+    def percent(self, backend):
+        """Get the utilization of each CPU since the previous call.
+
+        Args:
+            backend: psutil or pattoo.procfs module used to read CPU times
+
+        Returns:
+            result: List of (field, sources, values) tuples. sources are the
+                CPU names and values the percentage of time each CPU spent
+                in the field. Empty on the first call
+
+        """
+        # Initialize key variables
+        result = []
+        cpu_times = backend.cpu_times(percpu=True)
+        if bool(cpu_times) is False:
+            return result
+        fields = cpu_times[0]._fields + ('busy',)
+        current = numpy.array(cpu_times, dtype=float)
+        sources = tuple(
+            'cpu{}'.format(cpu_id) for cpu_id in _cpu_ids(len(cpu_times)))
+
+        with self._lock:
+            previous = self._cpu_times
+            self._cpu_times = current
+
+            # Start again if CPUs have been taken online or offline
+            if previous is None or bool(sources) is False or (
+                    sources != self._sources):
+                self._sources = sources
+                return result
+
+        # Calculate the percentages of all CPUs at once
+        deltas = numpy.maximum(current - previous, 0)
+        included = numpy.array(
+            [field not in _GUEST_FIELDS for field in fields[:-1]])
+        totals = deltas[:, included].sum(axis=1)
+        percent = numpy.divide(
+            deltas * 100.0, totals[:, None],
+            out=numpy.zeros_like(deltas), where=totals[:, None] > 0)
+
+        # Time not spent idle or waiting for I/O
+        idle = [fields.index(field) for field in ('idle', 'iowait')
+                if field in fields]
+        busy = numpy.clip(100 - percent[:, idle].sum(axis=1), 0, 100)
+        busy[totals <= 0] = 0
+        percent = numpy.column_stack((percent, busy)).round(2)
+
+        # Return one series per field
+        for index, field in enumerate(fields):
+            result.append((field, sources, percent[:, index].tolist()))
+        return result
+
+
+def _cpu_ids(count):
+    """Get the IDs of the online CPUs.
+
+    Args:
+        count: Number of CPUs whose times were read
+
+    Returns:
+        result: List of CPU IDs. Empty if a CPU was taken online or offline
+            since the times were read
+
+    """
+    # Use positions where /proc/stat doesn't exist
+    try:
+        result = procfs.cpu_ids()
+    except OSError:
+        result = list(range(count))
+    if len(result) != count:
+        result = []
+    return result
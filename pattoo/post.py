@@ -13,6 +13,7 @@ Description:
 import os
 import socket
 import json
+import time
 from collections import defaultdict
 
 # pip3 libraries
@@ -23,6 +24,12 @@ from pattoo import log
 from pattoo import general
 from pattoo import data as pattoo_data
 from pattoo import configuration
+from pattoo import session
+from pattoo import compression
+from pattoo import spool
+from pattoo import drain
+from pattoo import breaker
+from pattoo import serializer
 
 
 class Data(object):
@@ -62,14 +69,44 @@ class Data(object):
                 prefix, config.api_server_name(),
                 config.api_server_port(), config.api_server_uri(), agent_id))
 
+        # Cache files are posted in batches to this URL if configured
+        self._batch_url = '{}/batch'.format(self._url)
+        self._batch_count = config.api_batch_count()
+        self._batch_bytes = config.api_batch_bytes()
+
+        # Reuse connections to the server for all posts. Stop contacting
+        # it after repeated failures
+        self._session = session.session(config)
+        self._breaker = breaker.breaker(config)
+        self._timeout = session.timeout(config)
+        self._compression = compression.method(config.api_compression())
+
+        # Use the fastest serializer that the server accepts
+        self._negotiator = serializer.negotiator(config)
+        self._serializer = self._negotiator.select()
+
         # Create the cache directory
         self._cache_dir = config.agent_cache_directory()
         if os.path.exists(self._cache_dir) is False:
             os.mkdir(self._cache_dir)
 
-        # All cache files created by this agent will end with this suffix.
+        # Data that can't be posted is kept in a spool in the cache
+        # directory. Older versions kept each post in its own cache file,
+        # ending with this suffix followed by an extension for the
+        # compression method
         devicehash = general.hashstring(self._data['agent_hostname'], sha=1)
-        self._cache_filename_suffix = '{}_{}.json'.format(agent_id, devicehash)
+        self._cache_filename_suffix = '{}_{}'.format(agent_id, devicehash)
+        spool_dir = os.path.join(
+            self._cache_dir, 'spool_{}'.format(self._cache_filename_suffix))
+        self._spool = spool.spool(spool_dir, config)
+
+        # Spooled data is posted in the background
+        self._drain = drain.drain(spool_dir, config)
+        self._drain_order = config.api_drain_order()
+
+        # Size of the latest data posted and the time taken to post it
+        self.payload_bytes = None
+        self.post_seconds = None
 
     def post(self, save=True, data=None):
         """Post data to central server.
@@ -82,100 +119,436 @@ class Data(object):
             success: True: if successful
 
         """
-        # Initialize key variables
-        success = False
-        response = False
-        timestamp = self._data['timestamp']
-
         # Create data to post
         if data is None:
             data = self._data
 
-        # Post data save to cache if this fails
-        try:
-            result = requests.post(self._url, json=data)
-            response = True
-        except:
+        # Serialize and compress the data only once
+        (url, payload, headers) = self.request(data)
+
+        # Spool the data without contacting the server if it is failing
+        if self._breaker.allow() is False:
+            self.post_seconds = None
             if save is True:
-                # Create a unique very long filename to reduce risk of
-                filename = '{}/{}_{}'.format(
-                    self._cache_dir, timestamp, self._cache_filename_suffix)
+                self.save(data, payload=payload)
+            return False
+
+        # Post data save to spool if this fails
+        start = time.monotonic()
+        (status, _) = self._send(url, payload, headers)
+        self.post_seconds = time.monotonic() - start
+        if status is None and save is True:
+            self.save(data, payload=payload)
+
+        # Return
+        success = self.posted(url, status)
+        return success
+
+    def request(self, data=None):
+        """Get the request that posts data to central server.
+
+        Args:
+            data: Data to post. If None, then uses self._data
+
+        Returns:
+            result: (url, payload, headers) tuple
+
+        """
+        # Create data to post
+        if data is None:
+            data = self._data
+
+        # Serialize and compress the data
+        payload = compression.encode(
+            data, self._compression, self._serializer)
+        self.payload_bytes = len(payload)
+
+        # Return
+        result = (
+            self._url, payload, _headers(
+                self._compression, serializer.CONTENT_TYPES[self._serializer]))
+        return result
+
+    def save(self, data=None, payload=None):
+        """Add data to the spool without posting it.
+
+        Args:
+            data: Data to save. If None, then uses self._data
+            payload: Data already serialized by request(). If None, then
+                data is serialized
+
+        Returns:
+            None
+
+        """
+        # Create data to save
+        if data is None:
+            data = self._data
+        if payload is None:
+            payload = compression.encode(
+                data, self._compression, self._serializer)
+            self.payload_bytes = len(payload)
 
-                # Save data
-                with open(filename, 'w') as f_handle:
-                    json.dump(data, f_handle)
+        # Spool the data
+        self._spool.append(
+            payload, data['timestamp'], self._compression, self._serializer)
 
+    def posted(self, url, status):
+        """Log the outcome of a post.
+
+        Args:
+            url: URL data was posted to
+            status: HTTP status code of the response. None if there was no
+                response
+
+        Returns:
+            success: True if the post was successful
+
+        """
         # Define success
-        if response is True:
-            if result.status_code == 200:
-                success = True
+        success = status == 200
 
         # Log message
         if success is True:
             log_message = (
                 'Agent "{}" successfully contacted server {}'
-                ''.format(self._agent_name, self._url))
+                ''.format(self._agent_name, url))
             log.log2info(1027, log_message)
         else:
             log_message = (
                 'Agent "{}" failed to contact server {}'
-                ''.format(self._agent_name, self._url))
+                ''.format(self._agent_name, url))
             log.log2warning(1028, log_message)
 
         # Return
         return success
 
+    def _send(self, url, payload, headers):
+        """Send a request to central server.
+
+        Args:
+            url: URL to post to
+            payload: Body of request
+            headers: Dict of HTTP headers
+
+        Returns:
+            result: (status, content) tuple of the HTTP status code and body
+                of the response. (None, None) if there was no response
+
+        """
+        # Post. Record the outcome whatever is raised, so that a probe of
+        # the breaker always completes
+        result = (None, None)
+        try:
+            response = self._session.post(
+                url, data=payload, headers=headers, timeout=self._timeout)
+            result = (response.status_code, response.content)
+            self._negotiator.advertise(response.headers.get('Accept-Post'))
+        except requests.exceptions.RequestException:
+            pass
+        finally:
+            self._breaker.record(result[0])
+        return result
+
     def purge(self):
-        """Purge data from cache by posting to central server.
+        """Purge data from spool by posting to central server.
+
+        The data is posted in the background, so this doesn't wait for the
+        spool to be emptied.
+
+        Args:
+            None
+
+        Returns:
+            success: True if posting was started
+
+        """
+        # Return
+        success = self._drain.start(self.units(), self._purge_unit)
+        return success
+
+    def units(self):
+        """Get the spooled records to post, in the order to post them.
 
         Args:
             None
 
         Returns:
-            success: "True: if successful
+            result: List of lists of spool.Record objects. Each list is
+                posted in a single request
+
+        """
+        # Move cache files left by older versions to the spool
+        self._import_cache_files()
+
+        # Post the oldest or newest data first
+        records = self._spool.records(
+            newest_first=self._drain_order == 'newest')
+
+        # Post many records per request if configured
+        if self._batch_count > 1:
+            result = self._batches(records)
+        else:
+            result = [[record] for record in records]
+        return result
+
+    def _batches(self, records):
+        """Group spooled records into batches.
+
+        Each batch contains records with the same compression method and
+        serializer, and is limited by the configured number of records and
+        bytes.
+
+        Args:
+            records: List of spool.Record objects, in the order to post them
+
+        Returns:
+            result: List of lists of spool.Record objects
 
         """
         # Initialize key variables
-        agent_id = self._data['agent_id']
+        result = []
+        batch = []
+        size = 0
+
+        for record in records:
+            # Start a new batch when full, or when the compression or
+            # serializer changes
+            if bool(batch) is True and (
+                    record.compression != batch[-1].compression or
+                    record.serializer != batch[-1].serializer or
+                    len(batch) >= self._batch_count or
+                    size + record.length > self._batch_bytes):
+                result.append(batch)
+                batch = []
+                size = 0
+
+            # Add the record to the batch
+            batch.append(record)
+            size += record.length
+
+        # Return
+        if bool(batch) is True:
+            result.append(batch)
+        return result
+
+    def unit_request(self, records):
+        """Get the request that posts spooled records to central server.
+
+        Batches of records are sent as newline delimited JSON, or as
+        MessagePack data back to back. The server responds with the
+        positions in the batch of the records it accepted.
+
+        Args:
+            records: List of spool.Record objects with the same compression
+                method and serializer, from units()
+
+        Returns:
+            result: (url, payload, headers, batch) tuple. batch is a list of
+                (spool.Record, payload) tuples. None if all the records are
+                corrupt
+
+        """
+        # Read the records, skipping corrupt ones
+        batch = []
+        for record in records:
+            payload = self._spool.read(record.key)
+            if payload is not None:
+                batch.append((record, payload))
+        if bool(batch) is False:
+            return None
+
+        # Post many records per request if configured
+        _compression = records[0].compression
+        _serializer = records[0].serializer
+        if self._batch_count > 1:
+            newline = b''
+            if _serializer == 'json':
+                newline = compression.newline(_compression)
+            payload = b''.join(
+                _payload + newline for _, _payload in batch)
+            result = (
+                self._batch_url, payload, _headers(
+                    _compression, serializer.BATCH_CONTENT_TYPES[_serializer]),
+                batch)
+        else:
+            result = (
+                self._url, batch[0][1], _headers(
+                    _compression, serializer.CONTENT_TYPES[_serializer]),
+                batch)
+        return result
+
+    def acknowledge(self, url, batch, status, content):
+        """Delete the spooled records that the server accepted.
+
+        Args:
+            url: URL the records were posted to
+            batch: List of (spool.Record, payload) tuples from
+                unit_request()
+            status: HTTP status code of the response. None if there was no
+                response
+            content: Body of the response
+
+        Returns:
+            success: True if every record was accepted
+
+        """
+        # Initialize key variables
+        acknowledged = []
+
+        # Get the positions of the accepted records
+        if self._batch_count > 1:
+            try:
+                if status != 200:
+                    raise ValueError('HTTP status {}'.format(status))
+                acknowledged = json.loads(content)['acknowledged']
+            except (ValueError, KeyError, TypeError) as error:
+                log_message = (
+                    'Agent "{}" failed to post {} spooled records to server '
+                    '{}: {}'.format(self._agent_name, len(batch), url, error))
+                log.log2warning(1048, log_message)
+        elif self.posted(url, status) is True:
+            acknowledged = [0]
+
+        # Delete the records that the server accepted
+        records = [
+            batch[index][0] for index in sorted(set(acknowledged))
+            if isinstance(index, int) is True and 0 <= index < len(batch)]
+        self._spool.acknowledge([record.key for record in records])
+        for record in records:
+            _log_purge(record, url)
+
+        # Return
+        success = len(records) == len(batch)
+        return success
+
+    def _purge_unit(self, records):
+        """Post spooled records and delete them once acknowledged.
+
+        Args:
+            records: List of spool.Record objects from units()
+
+        Returns:
+            success: True if every record was posted
+
+        """
+        # Nothing to post if the records are corrupt
+        request = self.unit_request(records)
+        if request is None:
+            return True
+
+        # Stop if the server is failing
+        if self._breaker.allow() is False:
+            return False
+
+        # Post
+        (url, payload, headers, batch) = request
+        (status, content) = self._send(url, payload, headers)
+
+        # Return
+        success = self.acknowledge(url, batch, status, content)
+        return success
+
+    def spool_depth(self):
+        """Get the number of posts waiting to be sent.
+
+        Args:
+            None
+
+        Returns:
+            result: Number of spooled posts
+
+        """
+        # Return
+        result = self._spool.depth()
+        return result
+
+    def _import_cache_files(self):
+        """Move the cache files of older versions to the spool.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Only check for cache files once
+        if self._cache_dir in _IMPORTED:
+            return
+        _IMPORTED.add(self._cache_dir)
 
         # Add files in cache directory to list only if they match the
         # cache suffix
-        all_filenames = [filename for filename in os.listdir(
-            self._cache_dir) if os.path.isfile(
-                os.path.join(self._cache_dir, filename))]
+        suffixes = tuple(
+            '{}{}'.format(self._cache_filename_suffix, extension)
+            for extension in compression.EXTENSIONS.values())
         filenames = [
-            filename for filename in all_filenames if filename.endswith(
-                self._cache_filename_suffix)]
+            filename for filename in os.listdir(self._cache_dir)
+            if filename.endswith(suffixes) and os.path.isfile(
+                os.path.join(self._cache_dir, filename))]
 
         # Read cache file
-        for filename in filenames:
-            # Only post files for our own UID value
-            if agent_id not in filename:
-                continue
-
-            # Get the full filepath for the cache file and post
+        for filename in sorted(filenames):
             filepath = os.path.join(self._cache_dir, filename)
-            with open(filepath, 'r') as f_handle:
-                try:
-                    data = json.load(f_handle)
-                except:
-                    # Log removal
-                    log_message = (
-                        'Error reading previously cached agent data file {} '
-                        'for agent {}. May be corrupted.'
-                        ''.format(filepath, self._agent_name))
-                    log.log2die(1064, log_message)
-
-            # Post file
-            success = self.post(save=False, data=data)
-
-            # Delete file if successful
-            if success is True:
-                os.remove(filepath)
-
-                # Log removal
+            _compression = compression.compression(filename)
+            with open(filepath, 'rb') as f_handle:
+                payload = f_handle.read()
+
+            # Compressed files are kept as they are. Check the others
+            try:
+                timestamp = int(filename.split('_')[0])
+                if _compression is None:
+                    json.loads(payload.decode())
+            except:
                 log_message = (
-                    'Purging cache file {} after successfully '
-                    'contacting server {}'
-                    ''.format(filepath, self._url))
-                log.log2info(1029, log_message)
+                    'Error reading previously cached agent data file {} '
+                    'for agent {}. May be corrupted.'
+                    ''.format(filepath, self._agent_name))
+                log.log2warning(1064, log_message)
+                continue
+
+            # Move the file
+            self._spool.append(payload, timestamp, _compression)
+            os.remove(filepath)
+
+
+def _headers(_compression, content_type='application/json'):
+    """Get the HTTP headers of a post.
+
+    Args:
+        _compression: Compression method of the body. None if uncompressed
+        content_type: Content-Type of the body
+
+    Returns:
+        result: Dict of HTTP headers
+
+    """
+    # Return
+    result = {'Content-Type': content_type}
+    if _compression is not None:
+        result['Content-Encoding'] = _compression
+    return result
+
+
+def _log_purge(record, url):
+    """Log the removal of a record from the spool after posting it.
+
+    Args:
+        record: spool.Record object
+        url: URL the record was posted to
+
+    Returns:
+        None
+
+    """
+    # Log removal
+    log_message = (
+        'Purging spooled data from {} after successfully '
+        'contacting server {}'
+        ''.format(record.timestamp, url))
+    log.log2info(1029, log_message)
+
+
+# Cache directories that have been checked for cache files of older versions
+_IMPORTED = set()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""Pattoo per-process collector.
+
+Description:
+
+    This module:
+        1) Keeps psutil.Process objects between polls, keyed by PID and
+           process start time
+        2) Reads the CPU, memory and I/O of every process in a single
+           oneshot() context, fanning out across threads on large hosts
+        3) Selects the top N processes by CPU usage with a heap
+
+"""
+# Standard libraries
+from concurrent.futures import ThreadPoolExecutor
+import heapq
+import threading
+import time
+
+# pip3 libraries
+import psutil
+
+# Pattoo libraries
+from pattoo import procfs
+
+# Number of processes each thread scans on large hosts
+_CHUNK_SIZE = 2000
+
+
+class _Sample(object):
+    """The values read from a single process."""
+
+    __slots__ = (
+        'key', 'process', 'name', 'cpu_time', 'cpu_percent', 'rss',
+        'read_bytes', 'write_bytes')
+
+    def __init__(self, key, process, name, cpu_time, rss, io_counters):
+        """Initialize the class.
+
+        Args:
+            key: (pid, start_time) tuple. start_time is from
+                pattoo.procfs.start_time()
+            process: psutil.Process object
+            name: Process name
+            cpu_time: Total user and system CPU time in seconds
+            rss: Resident set size in bytes
+            io_counters: psutil I/O counters named tuple. None if the
+                counters can't be read
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self.key = key
+        self.process = process
+        self.name = name
+        self.cpu_time = cpu_time
+        self.cpu_percent = 0.0
+        self.rss = rss
+        if io_counters is None:
+            self.read_bytes = self.write_bytes = None
+        else:
+            self.read_bytes = io_counters.read_bytes
+            self.write_bytes = io_counters.write_bytes
+
+    def source(self):
+        """Get the source name used in the agent data.
+
+        Args:
+            None
+
+        Returns:
+            result: Source name
+
+        """
+        # Return
+        result = '{}[{}]'.format(self.name, self.key[0])
+        return result
+
+
+class Processes(object):
+    """Read the top processes by CPU usage."""
+
+    def __init__(self, workers=4):
+        """Initialize the class.
+
+        Args:
+            workers: Number of threads to use on large hosts
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._samples = {}
+        self._timestamp = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def top(self, count):
+        """Get the processes using the most CPU since the previous call.
+
+        Args:
+            count: Number of processes to return
+
+        Returns:
+            result: (top, scanned, seconds) tuple. top is a list of _Sample
+                objects sorted by CPU usage, scanned the number of
+                processes read and seconds the time taken
+
+        """
+        # Initialize key variables
+        start = time.monotonic()
+        pids = psutil.pids()
+
+        with self._lock:
+            # Scan large hosts in parallel
+            if len(pids) > _CHUNK_SIZE:
+                chunks = [
+                    pids[index:index + _CHUNK_SIZE]
+                    for index in range(0, len(pids), _CHUNK_SIZE)]
+                samples = []
+                for result in self._executor.map(self._scan, chunks):
+                    samples.extend(result)
+            else:
+                samples = self._scan(pids)
+
+            # Calculate CPU usage since the previous scan
+            now = time.monotonic()
+            if self._timestamp is not None:
+                elapsed = max(now - self._timestamp, 1e-9)
+                for sample in samples:
+                    previous = self._samples.get(sample.key[0])
+                    if previous is not None and previous.key == sample.key:
+                        sample.cpu_percent = round(
+                            100 * (sample.cpu_time - previous.cpu_time) /
+                            elapsed, 2)
+
+            # Keep only the processes that still exist
+            self._samples = {sample.key[0]: sample for sample in samples}
+            self._timestamp = now
+
+        # Select the top processes without sorting all of them
+        top = heapq.nlargest(
+            count, samples, key=lambda sample: sample.cpu_percent)
+        result = (top, len(samples), time.monotonic() - start)
+        return result
+
+    def _scan(self, pids):
+        """Read the values of a list of processes.
+
+        Args:
+            pids: List of process IDs
+
+        Returns:
+            result: List of _Sample objects
+
+        """
+        # Initialize key variables
+        result = []
+
+        for pid in pids:
+            # Reuse the psutil.Process object from the previous scan unless
+            # the PID was reused by a process that started at another time
+            previous = self._samples.get(pid)
+            try:
+                start_time = procfs.start_time(pid)
+                if previous is None or previous.key[1] != start_time:
+                    process = psutil.Process(pid)
+                else:
+                    process = previous.process
+                (name, cpu_time, rss, io_counters) = _read(process)
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+
+            result.append(
+                _Sample((pid, start_time), process, name, cpu_time, rss,
+                        io_counters))
+
+        return result
+
+
+def _read(process):
+    """Read the values of a process.
+
+    Args:
+        process: psutil.Process object
+
+    Returns:
+        result: (name, cpu_time, rss, io_counters) tuple
+
+    """
+    # Read everything from /proc/[pid] only once
+    with process.oneshot():
+        cpu_times = process.cpu_times()
+        cpu_time = cpu_times.user + cpu_times.system
+        rss = process.memory_info().rss
+        name = process.name()
+        try:
+            io_counters = process.io_counters()
+        except (psutil.AccessDenied, AttributeError):
+            io_counters = None
+
+    # Return
+    result = (name, cpu_time, rss, io_counters)
+    return result
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""Pattoo native /proc collector backend.
+
+Description:
+
+    This module:
+        1) Reads /proc/stat, /proc/meminfo, /proc/vmstat, /proc/diskstats
+           and /proc/net/dev directly instead of through psutil
+        2) Keeps these files open between polls and re-reads them from
+           offset 0 into a reused buffer
+        3) Returns named tuples with the same fields as psutil so that
+           both backends produce exactly the same labels
+
+"""
+# Standard libraries
+import os
+import threading
+from collections import namedtuple
+
+# pip3 libraries
+import psutil
+
+# Define named tuples with the same fields as psutil on Linux
+_CPU_TIMES_FIELDS = [
+    'user', 'nice', 'system', 'idle', 'iowait', 'irq', 'softirq', 'steal',
+    'guest', 'guest_nice']
+scpustats = namedtuple(
+    'scpustats', ['ctx_switches', 'interrupts', 'soft_interrupts', 'syscalls'])
+svmem = namedtuple(
+    'svmem', ['total', 'available', 'percent', 'used', 'free', 'active',
+              'inactive', 'buffers', 'cached', 'shared', 'slab'])
+sswap = namedtuple(
+    'sswap', ['total', 'used', 'free', 'percent', 'sin', 'sout'])
+sdiskio = namedtuple(
+    'sdiskio', ['read_count', 'write_count', 'read_bytes', 'write_bytes',
+                'read_time', 'write_time', 'read_merged_count',
+                'write_merged_count', 'busy_time'])
+snetio = namedtuple(
+    'snetio', ['bytes_sent', 'bytes_recv', 'packets_sent', 'packets_recv',
+               'errin', 'errout', 'dropin', 'dropout'])
+
+# Kernel constants
+_CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+_SECTOR_SIZE = 512
+_PAGE_SIZE = 4 * 1024
+
+
+class _File(object):
+    """A /proc file kept open between reads."""
+
+    def __init__(self, filename, size=4096):
+        """Initialize the class.
+
+        Args:
+            filename: Name of file
+            size: Initial size of the read buffer
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._filename = filename
+        self._fd = None
+        self._buffer = bytearray(size)
+        self._lock = threading.Lock()
+
+    def read(self):
+        """Read the entire file from offset 0.
+
+        Args:
+            None
+
+        Returns:
+            result: Contents of the file as bytes
+
+        """
+        # Collectors run in parallel, but share the buffer
+        with self._lock:
+            # Open the file on first use so that descriptors are never
+            # inherited across the daemon's forks
+            if self._fd is None:
+                self._fd = os.open(self._filename, os.O_RDONLY)
+
+            # Grow the buffer until the whole file fits
+            while True:
+                size = os.preadv(self._fd, [self._buffer], 0)
+                if size < len(self._buffer):
+                    break
+                self._buffer = bytearray(len(self._buffer) * 2)
+
+            result = bytes(self._buffer[:size])
+        return result
+
+
+class _Files(object):
+    """All the files read by this module."""
+
+    def __init__(self):
+        """Initialize the class.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self.stat = _File('/proc/stat')
+        self.meminfo = _File('/proc/meminfo')
+        self.vmstat = _File('/proc/vmstat', size=8192)
+        self.diskstats = _File('/proc/diskstats', size=16384)
+        self.net_dev = _File('/proc/net/dev', size=16384)
+
+
+def cpu_times(percpu=False):
+    """Get CPU times.
+
+    Args:
+        percpu: Return the CPU times of each CPU if True
+
+    Returns:
+        result: Named tuple of system wide CPU times in seconds. A list of
+            named tuples, one per online CPU, if percpu is True
+
+    """
+    # Only the first line of /proc/stat is needed for system wide times
+    if percpu is False:
+        line = _FILES.stat.read().split(b'\n', 1)[0]
+        result = _cpu_times(line)
+    else:
+        result = [_cpu_times(line) for line in _percpu_lines()]
+    return result
+
+
+def cpu_ids():
+    """Get the IDs of the online CPUs.
+
+    IDs aren't contiguous once CPUs have been taken offline.
+
+    Args:
+        None
+
+    Returns:
+        result: List of CPU IDs in the same order as the CPU times returned
+            by cpu_times(percpu=True)
+
+    """
+    # Get the ID from the "cpuN" token of each line
+    result = [int(line.split(None, 1)[0][3:]) for line in _percpu_lines()]
+    return result
+
+
+def cpu_stats():
+    """Get CPU statistics.
+
+    Args:
+        None
+
+    Returns:
+        result: Named tuple of CPU statistics
+
+    """
+    # Initialize key variables
+    ctx_switches = interrupts = soft_interrupts = 0
+
+    # Process data
+    for line in _FILES.stat.read().splitlines():
+        if line.startswith(b'ctxt'):
+            ctx_switches = int(line.split()[1])
+        elif line.startswith(b'intr'):
+            interrupts = int(line.split(None, 2)[1])
+        elif line.startswith(b'softirq'):
+            soft_interrupts = int(line.split(None, 2)[1])
+
+    # Return
+    result = scpustats(ctx_switches, interrupts, soft_interrupts, 0)
+    return result
+
+
+def virtual_memory():
+    """Get memory utilization.
+
+    Args:
+        None
+
+    Returns:
+        result: Named tuple of memory values in bytes
+
+    """
+    # Initialize key variables
+    mems = _meminfo()
+    total = mems[b'MemTotal:']
+    free = mems[b'MemFree:']
+    buffers = mems.get(b'Buffers:', 0)
+    cached = mems.get(b'Cached:', 0) + mems.get(b'SReclaimable:', 0)
+    shared = mems.get(b'Shmem:', mems.get(b'MemShared:', 0))
+    active = mems.get(b'Active:', 0)
+    inactive = mems.get(b'Inactive:', 0)
+    slab = mems.get(b'Slab:', 0)
+
+    # Kernels older than 3.14 don't report available memory
+    available = mems.get(b'MemAvailable:', 0)
+    if available == 0:
+        available = free + buffers + cached
+    if available > total:
+        available = free
+
+    # Return
+    used = total - available
+    result = svmem(
+        total, available, _percent(used, total), used, free, active,
+        inactive, buffers, cached, shared, slab)
+    return result
+
+
+def swap_memory():
+    """Get swap utilization.
+
+    Args:
+        None
+
+    Returns:
+        result: Named tuple of swap values in bytes
+
+    """
+    # Initialize key variables
+    mems = _meminfo()
+    total = mems.get(b'SwapTotal:', 0)
+    free = mems.get(b'SwapFree:', 0)
+    used = total - free
+
+    # Swapped pages are reported in /proc/vmstat
+    vmstat = _FILES.vmstat.read()
+    sin = _vmstat_value(vmstat, b'\npswpin ') * _PAGE_SIZE
+    sout = _vmstat_value(vmstat, b'\npswpout ') * _PAGE_SIZE
+
+    # Return
+    result = sswap(total, used, free, _percent(used, total), sin, sout)
+    return result
+
+
+def disk_io_counters(perdisk=True):
+    """Get disk I/O counters for each disk.
+
+    Args:
+        perdisk: Only True is supported. Kept for psutil compatibility
+
+    Returns:
+        result: Dict of named tuples keyed by disk name
+
+    """
+    # Initialize key variables
+    result = {}
+
+    # Process data. The number of fields depends on the kernel version
+    for line in _FILES.diskstats.read().splitlines():
+        fields = line.split()
+        count = len(fields)
+        if count == 14 or count >= 18:
+            (reads, reads_merged, rbytes, rtime, writes, writes_merged,
+             wbytes, wtime, _, busy_time) = map(int, fields[3:13])
+        elif count == 7:
+            reads, rbytes, writes, wbytes = map(int, fields[3:7])
+            rtime = wtime = reads_merged = writes_merged = busy_time = 0
+        else:
+            continue
+        result[fields[2].decode()] = sdiskio(
+            reads, writes, rbytes * _SECTOR_SIZE, wbytes * _SECTOR_SIZE,
+            rtime, wtime, reads_merged, writes_merged, busy_time)
+
+    # Return
+    return result
+
+
+def net_io_counters(pernic=True):
+    """Get network I/O counters for each interface.
+
+    Args:
+        pernic: Only True is supported. Kept for psutil compatibility
+
+    Returns:
+        result: Dict of named tuples keyed by interface name
+
+    """
+    # Initialize key variables
+    result = {}
+
+    # Skip the two header lines
+    for line in _FILES.net_dev.read().splitlines()[2:]:
+        colon = line.rfind(b':')
+        fields = line[colon + 1:].split()
+        (bytes_recv, packets_recv, errin, dropin, _, _, _, _,
+         bytes_sent, packets_sent, errout, dropout) = map(int, fields[:12])
+        result[line[:colon].strip().decode()] = snetio(
+            bytes_sent, bytes_recv, packets_sent, packets_recv,
+            errin, errout, dropin, dropout)
+
+    # Return
+    return result
+
+
+def pids():
+    """Get the process IDs running on the system.
+
+    Args:
+        None
+
+    Returns:
+        result: List of process IDs
+
+    """
+    # Return
+    result = [int(pid) for pid in os.listdir(b'/proc') if pid.isdigit()]
+    return result
+
+
+def start_time(pid):
+    """Get the time that a process started.
+
+    Args:
+        pid: Process ID
+
+    Returns:
+        result: Clock ticks after boot that the process started. A
+            different value for the same PID means the PID was reused
+
+    """
+    # Read field 22 of the process status. The command name in field 2 can
+    # contain spaces and parentheses, so count from the end of it
+    try:
+        with open('/proc/{}/stat'.format(pid), 'rb') as f_handle:
+            contents = f_handle.read()
+    except FileNotFoundError:
+        raise psutil.NoSuchProcess(pid)
+    result = int(contents.rsplit(b')', 1)[1].split()[19])
+    return result
+
+
+def _cpu_times(line):
+    """Convert a line of /proc/stat to a CPU times named tuple.
+
+    Args:
+        line: Line of /proc/stat starting with "cpu"
+
+    Returns:
+        result: Named tuple of CPU times in seconds
+
+    """
+    # Return
+    values = line.split()[1:len(_CPU_TIMES_FIELDS) + 1]
+    result = _scputimes(len(values))(
+        *[int(value) / _CLOCK_TICKS for value in values])
+    return result
+
+
+def _percpu_lines():
+    """Get the lines of /proc/stat for each CPU.
+
+    Args:
+        None
+
+    Returns:
+        result: List of lines starting with "cpuN"
+
+    """
+    # Return
+    result = [
+        line for line in _FILES.stat.read().splitlines()
+        if line.startswith(b'cpu') and line[3:4].isdigit()]
+    return result
+
+
+def _meminfo():
+    """Read /proc/meminfo.
+
+    Args:
+        None
+
+    Returns:
+        result: Dict of values in bytes keyed by field name
+
+    """
+    # Process data
+    result = {}
+    for line in _FILES.meminfo.read().splitlines():
+        fields = line.split()
+        result[fields[0]] = int(fields[1]) * 1024
+    return result
+
+
+def _vmstat_value(vmstat, key):
+    """Find a value in the contents of /proc/vmstat without splitting it.
+
+    Args:
+        vmstat: Contents of /proc/vmstat
+        key: Key to find, including the preceding newline and trailing space
+
+    Returns:
+        result: Value
+
+    """
+    # Return 0 for kernels that don't report the key
+    start = vmstat.find(key)
+    if start == -1:
+        result = 0
+    else:
+        start += len(key)
+        result = int(vmstat[start:vmstat.find(b'\n', start)])
+    return result
+
+
+def _scputimes(count):
+    """Get the CPU times named tuple for the fields the kernel reports.
+
+    Args:
+        count: Number of fields
+
+    Returns:
+        result: Named tuple class
+
+    """
+    # Create the named tuple only once for each field count
+    if count not in _SCPUTIMES:
+        _SCPUTIMES[count] = namedtuple(
+            'scputimes', _CPU_TIMES_FIELDS[:count])
+    result = _SCPUTIMES[count]
+    return result
+
+
+def _percent(used, total):
+    """Calculate a percentage the way psutil does.
+
+    Args:
+        used: Amount used
+        total: Total amount
+
+    Returns:
+        result: Percentage rounded to one decimal place
+
+    """
+    # Return
+    try:
+        result = round((float(used) / total) * 100, 1)
+    except ZeroDivisionError:
+        result = 0.0
+    return result
+
+
+# Files kept open between polls
+_FILES = _Files()
+
+# Named tuple classes keyed by number of CPU time fields
+_SCPUTIMES = {}
+
+# Functions that are identical for both backends
+disk_partitions = psutil.disk_partitions
+disk_usage = psutil.disk_usage
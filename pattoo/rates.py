@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Pattoo counter to rate conversion.
+
+Description:
+
+    This module:
+        1) Keeps the counter values of the previous poll
+        2) Converts counters to per second rates, handling 32 and 64 bit
+           counter wraparound, reboots and sources that appear or disappear
+
+"""
+# Standard libraries
+import threading
+import time
+
+# pip3 libraries
+import psutil
+
+# SNMP style base_types of counters
+_COUNTER_BASE_TYPES = (32, 64)
+
+
+class Rates(object):
+    """Convert counters to rates using the values of the previous poll."""
+
+    def __init__(self):
+        """Initialize the class.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._previous = {}
+        self._boot_time = None
+        self._lock = threading.Lock()
+
+    def convert(self, _data, keep=True):
+        """Add a rate series for each counter series.
+
+        Rates are added as series labelled with a "_rate" suffix. No rate
+        is reported for a source until it has been seen in two polls.
+
+        Args:
+            _data: pattoo.data._Data object
+            keep: Keep the counter series if True, remove them otherwise
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        now = time.monotonic()
+        boot_time = psutil.boot_time()
+
+        with self._lock:
+            # Counters restart from zero after a reboot
+            if boot_time != self._boot_time:
+                self._previous = {}
+                self._boot_time = boot_time
+
+            for series in _data.series():
+                # Only process counters
+                if series.base_type not in _COUNTER_BASE_TYPES:
+                    continue
+                label = series.label
+                rate = None
+
+                # Collectors that weren't due this poll reuse their previous
+                # series. Report their previous rates as well
+                if label in self._previous:
+                    (then, previous, values, rate) = self._previous[label]
+                    if previous is not series:
+                        current = dict(zip(series.sources, series.values))
+                        rate = _rate(series, values, current, now - then)
+                        self._previous[label] = (now, series, current, rate)
+                else:
+                    current = dict(zip(series.sources, series.values))
+                    self._previous[label] = (now, series, current, rate)
+
+                # Add the rates
+                if rate is not None:
+                    _data.add(*rate)
+
+                # Remove counters if only rates are required
+                if keep is False:
+                    _data.remove(label)
+
+
+def _rate(series, previous, current, elapsed):
+    """Calculate a rate series from two sets of counter values.
+
+    Args:
+        series: pattoo.data.Series object of counters
+        previous: Dict of previous counter values keyed by source
+        current: Dict of current counter values keyed by source
+        elapsed: Seconds between the two sets of values
+
+    Returns:
+        result: Arguments for pattoo.data._Data.add(). None if no time
+            has passed
+
+    """
+    # Initialize key variables
+    sources = []
+    values = []
+
+    # Nothing to do if no time has passed
+    if elapsed <= 0:
+        return None
+
+    # Only report sources that have been seen twice and that didn't reset
+    for source in series.sources:
+        if source not in previous:
+            continue
+        delta = _delta(previous[source], current[source])
+        if delta is None:
+            continue
+        sources.append(source)
+        values.append(round(delta / elapsed, 3))
+
+    # Return
+    if bool(series.description) is True:
+        description = '{} (Per Second)'.format(series.description)
+    else:
+        description = ''
+    result = (
+        '{}_rate'.format(series.label), 1, sources, values, description)
+    return result
+
+
+def _delta(previous, current):
+    """Calculate the increase of a counter, allowing for wraparound.
+
+    Args:
+        previous: Previous counter value
+        current: Current counter value
+
+    Returns:
+        result: Increase of the counter. None if the counter was reset
+
+    """
+    # Initialize key variables
+    result = current - previous
+
+    # Counters that have decreased have either wrapped or been reset.
+    # Assume a wrap only if the counter was in the upper half of its range
+    if result < 0:
+        delta = result
+        result = None
+        if isinstance(current, int) is True:
+            for width in (32, 64):
+                wrapped = delta + 2 ** width
+                if previous < 2 ** width and 0 <= wrapped < 2 ** (width - 1):
+                    result = wrapped
+                    break
+    return result
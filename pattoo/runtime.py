@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""Pattoo asyncio runtime.
+
+Description:
+
+    This module:
+        1) Runs pattoo-os-actived on a single asyncio event loop instead of
+           an uploader thread and a pool of drain threads
+        2) Polls on schedule with loop.call_at() against the monotonic
+           clock. Polls, serialization and spool access run in a small
+           thread pool executor so that they don't block the loop
+        3) Posts data and drains the spool with aiohttp, keeping many posts
+           in flight on the loop's thread
+        4) Spools polls when the upload queue is full, and when stopped
+
+    aiohttp is an optional package. The threaded runtime is used if it is
+    not installed.
+
+"""
+# Standard libraries
+import asyncio
+import functools
+import signal
+from concurrent.futures import ThreadPoolExecutor
+
+# pip3 libraries
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# Pattoo libraries
+from pattoo import log
+from pattoo import post
+from pattoo import drain
+from pattoo import breaker
+from pattoo import serializer
+from pattoo import data as pattoo_data
+from pattoo import overhead as pattoo_overhead
+
+# Number of threads used for polling and disk access. Polling runs the
+# collectors in its own pool
+_EXECUTOR_WORKERS = 2
+
+
+def available():
+    """Determine whether the asyncio runtime can be used.
+
+    Args:
+        None
+
+    Returns:
+        result: True if aiohttp is installed
+
+    """
+    # Return
+    result = aiohttp is not None
+    return result
+
+
+class Runtime(object):
+    """Poll and post data on an asyncio event loop."""
+
+    def __init__(self, config, sampler=None, overhead=None):
+        """Initialize the class.
+
+        Args:
+            config: ConfigAgent object
+            sampler: pattoo.sampler.Sampler object whose aggregates should be
+                added to the data
+            overhead: pattoo.overhead.Overhead object to record the costs
+                of each post in. None if not recording costs
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._config = config
+        self._sampler = sampler
+        self._overhead = overhead
+        self._executor = ThreadPoolExecutor(max_workers=_EXECUTOR_WORKERS)
+        self._bucket = drain.TokenBucket(
+            config.api_drain_rate(), config.api_drain_burst())
+        self._workers = max(config.api_drain_workers(), 1)
+        self._breaker = breaker.breaker(config)
+        self._negotiator = serializer.negotiator(config)
+        self._session = None
+        self._queue = None
+        self._stopped = None
+        self._timer = None
+        self._polling = None
+        self._draining = None
+        self._current = None
+
+    def run(self):
+        """Poll and post data until SIGTERM is received.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Run
+        asyncio.run(self._main())
+
+    async def _main(self):
+        """Poll and post data until SIGTERM is received.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        self._queue = asyncio.Queue(
+            maxsize=max(1, self._config.upload_queue_size()))
+        connector = aiohttp.TCPConnector(
+            limit=self._workers + 1, ttl_dns_cache=self._config.api_dns_ttl())
+        timeout = aiohttp.ClientTimeout(
+            sock_connect=self._config.api_connect_timeout(),
+            sock_read=self._config.api_read_timeout())
+
+        async with aiohttp.ClientSession(
+                connector=connector, timeout=timeout) as self._session:
+            # Post queued data, and start polling now
+            loop.add_signal_handler(signal.SIGTERM, self._stopped.set)
+            uploader = loop.create_task(self._upload())
+            self._schedule(loop.time())
+            await self._stopped.wait()
+
+            # Stop posting
+            self._timer.cancel()
+            tasks = [uploader]
+            if self._draining is not None:
+                tasks.append(self._draining)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+            # Let a poll in progress queue its data
+            if self._polling is not None:
+                await asyncio.gather(self._polling, return_exceptions=True)
+
+        # Spool the data that is still waiting to be posted
+        pending = [] if self._current is None else [self._current]
+        while self._queue.empty() is False:
+            pending.append(self._queue.get_nowait())
+        for data_dict in pending:
+            post.Data(data_dict).save()
+
+        # Don't wait for threads hung on network filesystems
+        self._executor.shutdown(wait=False)
+
+    def _schedule(self, deadline):
+        """Schedule the next poll.
+
+        Args:
+            deadline: Time of the next poll by the loop's monotonic clock
+
+        Returns:
+            None
+
+        """
+        # Don't poll again once stopped
+        if self._stopped.is_set() is True:
+            return
+
+        # Schedule
+        loop = asyncio.get_running_loop()
+        self._timer = loop.call_at(deadline, self._start_poll, deadline)
+
+    def _start_poll(self, deadline):
+        """Start a scheduled poll.
+
+        Args:
+            deadline: Time the poll was scheduled for
+
+        Returns:
+            None
+
+        """
+        # Keep a reference so that the poll can't be garbage collected
+        # before it finishes, and can be waited for when stopping
+        loop = asyncio.get_running_loop()
+        self._polling = loop.create_task(self._poll(deadline))
+
+    async def _poll(self, deadline):
+        """Poll and queue data for posting, then schedule the next poll.
+
+        Args:
+            deadline: Time this poll was scheduled for
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        loop = asyncio.get_running_loop()
+
+        try:
+            # Get system data
+            data_dict = await self._run(
+                pattoo_data.poll, self._config, self._sampler, self._overhead,
+                self._breaker)
+
+            # Queue it for posting. Spool it if the uploader can't keep up
+            try:
+                self._queue.put_nowait(data_dict)
+            except asyncio.QueueFull:
+                log_message = (
+                    'Upload queue is full. Spooling data from {}'
+                    ''.format(data_dict['timestamp']))
+                log.log2warning(1074, log_message)
+                server = await self._run(post.Data, data_dict)
+                await self._run(server.save)
+                self._record(server, data_dict, None)
+        except Exception as error:
+            log_message = 'Failed to poll data: {}'.format(error)
+            log.log2warning(1076, log_message)
+        finally:
+            # Skip polls that are already late
+            self._schedule(
+                max(deadline + self._config.interval(), loop.time()))
+
+    async def _upload(self):
+        """Post queued data until cancelled.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Post
+        while True:
+            self._current = await self._queue.get()
+            try:
+                await self._post(self._current)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                log_message = 'Failed to upload data: {}'.format(error)
+                log.log2warning(1075, log_message)
+            self._current = None
+
+    async def _post(self, data_dict):
+        """Post polled data to the central server.
+
+        Args:
+            data_dict: Polled data
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        loop = asyncio.get_running_loop()
+
+        # Serialize and compress the data in the executor
+        server = await self._run(post.Data, data_dict)
+        (url, payload, headers) = await self._run(server.request)
+
+        # Spool the data without contacting the server if it is failing
+        if self._breaker.allow() is False:
+            await self._run(server.save, None, payload)
+            self._record(server, data_dict, None)
+            return
+
+        # Post data save to spool if this fails
+        start = loop.time()
+        (status, _) = await self._send(url, payload, headers)
+        post_seconds = loop.time() - start
+        if status is None:
+            await self._run(server.save, None, payload)
+
+        # Purge cache if success is True
+        if server.posted(url, status) is True:
+            if self._draining is None or self._draining.done() is True:
+                self._draining = loop.create_task(self._purge(server))
+
+        # Record the costs of this post for the next upload
+        self._record(server, data_dict, post_seconds)
+
+    async def _purge(self, server):
+        """Purge data from spool by posting to central server.
+
+        Up to api_drain_workers posts are in flight at once. Posting stops
+        at the first failure.
+
+        Args:
+            server: pattoo.post.Data object
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        units = await self._run(server.units)
+        if bool(units) is False:
+            return
+        stop = asyncio.Event()
+        posted = []
+        work = iter(units)
+
+        # Share the work between the workers
+        await asyncio.gather(*[
+            self._purge_units(server, work, stop, posted)
+            for _ in range(min(self._workers, len(units)))])
+        drain.report(len(units), len(posted), loop.time() - start)
+
+    async def _purge_units(self, server, work, stop, posted):
+        """Post units of work until there are none left or a post fails.
+
+        Args:
+            server: pattoo.post.Data object
+            work: Iterator of units of work from server.units()
+            stop: asyncio.Event set when a post fails
+            posted: List of the units that were posted
+
+        Returns:
+            None
+
+        """
+        for unit in work:
+            # Wait for the rate limit
+            delay = self._bucket.delay()
+            while bool(delay) is True and stop.is_set() is False:
+                await asyncio.sleep(delay)
+                delay = self._bucket.delay()
+            if stop.is_set() is True:
+                break
+
+            # Nothing to post if the records are corrupt
+            request = await self._run(server.unit_request, unit)
+            if request is None:
+                posted.append(unit)
+                continue
+
+            # Stop if the server is failing
+            if self._breaker.allow() is False:
+                break
+
+            # Post. Leave the rest for the next drain if this fails
+            (url, payload, headers, batch) = request
+            (status, content) = await self._send(url, payload, headers)
+            success = await self._run(
+                server.acknowledge, url, batch, status, content)
+            if success is True:
+                posted.append(unit)
+            else:
+                stop.set()
+
+    async def _send(self, url, payload, headers):
+        """Send a request to central server.
+
+        Args:
+            url: URL to post to
+            payload: Body of request
+            headers: Dict of HTTP headers
+
+        Returns:
+            result: (status, content) tuple of the HTTP status code and body
+                of the response. (None, None) if there was no response
+
+        """
+        # Post. Record the outcome even if cancelled, so that a probe of the
+        # breaker always completes
+        result = (None, None)
+        try:
+            async with self._session.post(
+                    url, data=payload, headers=headers) as response:
+                result = (response.status, await response.read())
+                self._negotiator.advertise(
+                    response.headers.get('Accept-Post'))
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+        finally:
+            self._breaker.record(result[0])
+        return result
+
+    async def _run(self, function, *args):
+        """Run a blocking function in the executor.
+
+        Args:
+            function: Function to run
+            args: Arguments of function
+
+        Returns:
+            result: Return value of function
+
+        """
+        # Return
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            self._executor, functools.partial(function, *args))
+        return result
+
+    def _record(self, server, data_dict, post_seconds):
+        """Record the costs of posting or spooling data.
+
+        Args:
+            server: pattoo.post.Data object
+            data_dict: Polled data
+            post_seconds: Seconds taken to post the data. None if the data
+                wasn't posted
+
+        Returns:
+            None
+
+        """
+        # Record
+        if self._overhead is not None:
+            self._overhead.record(
+                server.payload_bytes, pattoo_overhead.series(data_dict),
+                post_seconds=post_seconds, spool_depth=server.spool_depth())
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Pattoo sub-interval sampler.
+
+Description:
+
+    This module:
+        1) Reads selected gauges many times between uploads
+        2) Stores the samples in a preallocated ring buffer
+        3) Reduces the samples to min, max, mean and p95 values that are
+           sent with the normal upload
+
+"""
+# Standard libraries
+import os
+import math
+import threading
+import time
+
+# pip3 libraries
+import numpy
+
+# Pattoo libraries
+from pattoo import log
+
+# Memory fields worth sampling. The rest rarely change
+_MEMORY_FIELDS = ('available', 'free', 'percent', 'used')
+
+# Statistics calculated for each gauge
+_STATISTICS = ('min', 'max', 'mean', 'p95')
+
+
+class Sampler(object):
+    """Sample gauges between uploads."""
+
+    def __init__(self, backend, sample_interval, interval):
+        """Initialize the class.
+
+        Args:
+            backend: psutil or pattoo.procfs module used to read gauges
+            sample_interval: Seconds between samples
+            interval: Seconds between uploads
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._backend = backend
+        self._sample_interval = sample_interval
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+        # Define the gauges as (label, sources, columns in the buffer)
+        cpu_times = backend.cpu_times()
+        self._cpu_times = numpy.array(cpu_times, dtype=float)
+        self._cpu_total = numpy.array(
+            [field not in ('guest', 'guest_nice')
+             for field in cpu_times._fields])
+        gauges = [
+            ('cpu_times_percent', cpu_times._fields),
+            ('load_average_01min', (None,)),
+            ('load_average_05min', (None,)),
+            ('load_average_15min', (None,)),
+            ('memory', _MEMORY_FIELDS),
+        ]
+        self._gauges = []
+        start = 0
+        for label, sources in gauges:
+            stop = start + len(sources)
+            self._gauges.append((label, sources, slice(start, stop)))
+            start = stop
+
+        # Preallocate enough rows for one upload interval
+        capacity = max(1, int(math.ceil(interval / sample_interval)))
+        self._buffer = numpy.zeros((capacity, start))
+        self._count = 0
+        self._position = 0
+
+    def start(self):
+        """Start sampling in a background thread.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Start
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Stop
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def sample(self):
+        """Read all the gauges once and add them to the ring buffer.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Calculate CPU percentages since the previous sample
+        cpu_times = numpy.array(self._backend.cpu_times(), dtype=float)
+        deltas = numpy.maximum(cpu_times - self._cpu_times, 0)
+        self._cpu_times = cpu_times
+        total = deltas[self._cpu_total].sum()
+        if total > 0:
+            cpu_percent = numpy.clip(deltas * (100.0 / total), 0, 100)
+        else:
+            cpu_percent = numpy.zeros(len(deltas))
+
+        # Read the remaining gauges
+        memory = self._backend.virtual_memory()
+        row = numpy.concatenate((
+            cpu_percent,
+            os.getloadavg(),
+            [getattr(memory, field) for field in _MEMORY_FIELDS]))
+
+        # Add to the buffer, overwriting the oldest sample when full
+        with self._lock:
+            self._buffer[self._position] = row
+            self._position = (self._position + 1) % len(self._buffer)
+            self._count = min(self._count + 1, len(self._buffer))
+
+    def aggregates(self):
+        """Reduce the samples taken since the last call to aggregates.
+
+        Args:
+            None
+
+        Returns:
+            result: List of (label, sources, values) tuples. Labels are the
+                gauge labels suffixed with the name of the statistic
+
+        """
+        # Initialize key variables
+        result = []
+
+        # Get the samples and reset the buffer for the next interval
+        with self._lock:
+            if bool(self._count) is False:
+                return result
+            samples = self._buffer[:self._count].copy()
+            self._count = 0
+            self._position = 0
+
+        # Reduce all the columns at once
+        statistics = zip(_STATISTICS, (
+            samples.min(axis=0),
+            samples.max(axis=0),
+            samples.mean(axis=0),
+            numpy.percentile(samples, 95, axis=0)))
+
+        # Split the results by gauge
+        for name, values in statistics:
+            for label, sources, columns in self._gauges:
+                result.append((
+                    '{}_{}'.format(label, name),
+                    sources,
+                    [round(value, 2) for value in values[columns].tolist()]))
+        return result
+
+    def _run(self):
+        """Take samples on schedule until stopped.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Schedule against the monotonic clock so that slow samples don't
+        # make the schedule drift
+        deadline = time.monotonic()
+        while True:
+            deadline += self._sample_interval
+            if self._stop.wait(max(0, deadline - time.monotonic())) is True:
+                break
+            try:
+                self.sample()
+            except Exception as error:
+                log_message = 'Sub-interval sampling failed: {}'.format(error)
+                log.log2warning(1036, log_message)
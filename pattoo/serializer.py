@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""Pattoo serializers.
+
+Description:
+
+    This module:
+        1) Serializes agent data to JSON with orjson if it is installed,
+           falling back to the standard library
+        2) Serializes agent data to MessagePack if the "msgpack" package is
+           installed
+        3) Chooses the serializer for posts from the media types the server
+           lists in the Accept-Post header of its responses, and for
+           pattoo-os-passived responses from the Accept header of requests
+
+"""
+# Standard libraries
+import json
+import threading
+
+# pip3 libraries
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Pattoo libraries
+from pattoo import log
+
+# Content-Type of data keyed by serializer
+CONTENT_TYPES = {
+    'json': 'application/json',
+    'msgpack': 'application/msgpack',
+}
+
+# Content-Type of batches keyed by serializer. MessagePack data is sent
+# back to back
+BATCH_CONTENT_TYPES = {
+    'json': 'application/x-ndjson',
+    'msgpack': 'application/msgpack',
+}
+
+# Negotiators keyed by (https, hostname, port), shared by all posts
+_NEGOTIATORS = {}
+_LOCK = threading.Lock()
+
+
+class Negotiator(object):
+    """Choose the serializer for posts to a server."""
+
+    def __init__(self, preference='auto'):
+        """Initialize the class.
+
+        Args:
+            preference: Serializer in the configuration. "auto" uses
+                MessagePack once the server advertises it, "json" always
+                uses JSON and "msgpack" always uses MessagePack
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._preference = preference
+        self._advertised = set()
+        if preference not in ('auto', 'json', 'msgpack'):
+            log_message = (
+                'Unknown serializer "{}". Using JSON.'.format(preference))
+            log.log2warning(1058, log_message)
+            self._preference = 'json'
+        elif preference == 'msgpack' and msgpack is None:
+            log_message = (
+                'The "msgpack" package is not installed. Using JSON.')
+            log.log2warning(1059, log_message)
+            self._preference = 'json'
+
+    def advertise(self, header):
+        """Record the media types that the server accepts.
+
+        Args:
+            header: Value of the Accept-Post header of a response. None if
+                the server didn't send one
+
+        Returns:
+            None
+
+        """
+        # Record
+        if header is not None:
+            self._advertised = set(_media_types(header))
+
+    def select(self):
+        """Get the serializer to use for the next post.
+
+        Args:
+            None
+
+        Returns:
+            result: "json" or "msgpack"
+
+        """
+        # Return
+        result = 'json'
+        if self._preference == 'msgpack' or (
+                self._preference == 'auto' and msgpack is not None and
+                CONTENT_TYPES['msgpack'] in self._advertised):
+            result = 'msgpack'
+        return result
+
+
+def dumps(data, serializer='json'):
+    """Serialize data.
+
+    Args:
+        data: Data to serialize
+        serializer: "json" or "msgpack"
+
+    Returns:
+        result: Serialized data as bytes
+
+    """
+    # Return
+    if serializer == 'msgpack':
+        result = msgpack.packb(data, use_bin_type=True)
+    elif orjson is not None:
+        result = orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    else:
+        result = json.dumps(data).encode()
+    return result
+
+
+def accepted(header):
+    """Choose the serializer of a response from the Accept header.
+
+    Args:
+        header: Value of the Accept header of the request. None if the
+            client didn't send one
+
+    Returns:
+        result: "json" or "msgpack"
+
+    """
+    # Only use MessagePack if the client asked for it
+    result = 'json'
+    if msgpack is not None and header is not None and (
+            CONTENT_TYPES['msgpack'] in _media_types(header)):
+        result = 'msgpack'
+    return result
+
+
+def advertised():
+    """Get the media types that can be posted to a server, for the
+    Accept-Post header of its responses.
+
+    Args:
+        None
+
+    Returns:
+        result: Comma separated media types
+
+    """
+    # Return
+    serializers = ['json'] if msgpack is None else ['msgpack', 'json']
+    result = ', '.join(
+        CONTENT_TYPES[serializer] for serializer in serializers)
+    return result
+
+
+def negotiator(config):
+    """Get the shared negotiator for the server in the configuration.
+
+    Args:
+        config: ConfigAgent object
+
+    Returns:
+        result: Negotiator object
+
+    """
+    # Initialize key variables
+    key = (
+        config.api_server_https() is True, config.api_server_name(),
+        config.api_server_port())
+
+    # Create the negotiator only once
+    with _LOCK:
+        if key not in _NEGOTIATORS:
+            _NEGOTIATORS[key] = Negotiator(config.api_serializer())
+        result = _NEGOTIATORS[key]
+    return result
+
+
+def _media_types(header):
+    """Get the media types in an Accept or Accept-Post header.
+
+    Args:
+        header: Value of header
+
+    Returns:
+        result: List of media types without parameters
+
+    """
+    # Return
+    result = [
+        media_type.split(';')[0].strip().lower()
+        for media_type in header.split(',')]
+    return result
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""Pattoo HTTP session.
+
+Description:
+
+    This module:
+        1) Keeps a single pooled HTTP session for all posts to the server,
+           so that connections and their TLS handshakes are reused between
+           posts
+        2) Caches the address of the server for a configurable time, so
+           that new connections don't need a DNS lookup
+        3) Applies connect and read timeouts to every post
+
+"""
+# Standard libraries
+import ipaddress
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+# pip3 libraries
+import requests
+from requests.adapters import HTTPAdapter
+
+# Pattoo libraries
+from pattoo import log
+
+
+class _Resolver(object):
+    """Cache of the address of a host."""
+
+    def __init__(self, hostname, port, ttl):
+        """Initialize the class.
+
+        Args:
+            hostname: Name of host
+            port: TCP port of host
+            ttl: Seconds to cache the address
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._hostname = hostname
+        self._port = port
+        self._ttl = ttl
+        self._address = None
+        self._expiry = 0
+        self._lock = threading.Lock()
+
+    def address(self):
+        """Get the address of the host.
+
+        Args:
+            None
+
+        Returns:
+            result: IP address. None if the host can't be resolved
+
+        """
+        # Look up the address again once it expires
+        with self._lock:
+            if time.monotonic() >= self._expiry:
+                try:
+                    addresses = socket.getaddrinfo(
+                        self._hostname, self._port, type=socket.SOCK_STREAM)
+                    self._address = addresses[0][4][0]
+                    self._expiry = time.monotonic() + self._ttl
+                except (socket.gaierror, IndexError) as error:
+                    log_message = (
+                        'Unable to resolve server {}: {}'
+                        ''.format(self._hostname, error))
+                    log.log2warning(1045, log_message)
+                    self._address = None
+            result = self._address
+        return result
+
+    def expire(self):
+        """Look up the address again on the next request.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Expire
+        with self._lock:
+            self._expiry = 0
+
+
+class _Adapter(HTTPAdapter):
+    """Adapter that connects to the cached address of the server."""
+
+    def __init__(self, hostname, port, https, ttl, maxsize):
+        """Initialize the class.
+
+        Args:
+            hostname: Name of server
+            port: TCP port of server
+            https: True if the server uses HTTPS
+            ttl: Seconds to cache the address of the server
+            maxsize: Maximum number of connections to keep open
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._hostname = hostname
+        self._https = https
+        self._resolver = _Resolver(hostname, port, ttl)
+        HTTPAdapter.__init__(
+            self, pool_connections=1, pool_maxsize=maxsize)
+
+    def init_poolmanager(self, *args, **kwargs):
+        """Create the connection pool manager.
+
+        Certificates are verified against the name of the server, and the
+        name is sent with the TLS handshake, even though connections are
+        made to its address.
+
+        Args:
+            args: Positional arguments of HTTPAdapter.init_poolmanager
+            kwargs: Keyword arguments of HTTPAdapter.init_poolmanager
+
+        Returns:
+            None
+
+        """
+        # Create the pool manager
+        if self._https is True:
+            kwargs['server_hostname'] = self._hostname
+            kwargs['assert_hostname'] = self._hostname
+        HTTPAdapter.init_poolmanager(self, *args, **kwargs)
+
+    def send(self, request, **kwargs):
+        """Send a request to the cached address of the server.
+
+        Args:
+            request: requests.PreparedRequest object
+            kwargs: Keyword arguments of HTTPAdapter.send
+
+        Returns:
+            result: requests.Response object
+
+        """
+        # Replace the name of the server with its address
+        address = self._resolver.address()
+        if address is not None:
+            parts = urlsplit(request.url)
+            if ipaddress.ip_address(address).version == 6:
+                address = '[{}]'.format(address)
+            if parts.port is not None:
+                address = '{}:{}'.format(address, parts.port)
+            request.headers['Host'] = parts.netloc
+            request.url = parts._replace(netloc=address).geturl()
+
+        # Look up the address again if the server can't be reached
+        try:
+            result = HTTPAdapter.send(self, request, **kwargs)
+        except requests.exceptions.ConnectionError:
+            self._resolver.expire()
+            raise
+        return result
+
+
+# Sessions keyed by (scheme, hostname, port). Created after daemonizing
+_SESSIONS = {}
+_LOCK = threading.Lock()
+
+
+def session(config):
+    """Get the shared session for the server in the configuration.
+
+    Args:
+        config: ConfigAgent object
+
+    Returns:
+        result: requests.Session object
+
+    """
+    # Initialize key variables
+    hostname = config.api_server_name()
+    port = config.api_server_port()
+    https = config.api_server_https() is True
+    scheme = 'https' if https is True else 'http'
+    key = (scheme, hostname, port)
+
+    # Keep a connection open for each drain worker and for new data
+    maxsize = max(4, config.api_drain_workers() + 1)
+
+    with _LOCK:
+        if key not in _SESSIONS:
+            result = requests.Session()
+            adapter = _Adapter(
+                hostname, port, https, config.api_dns_ttl(), maxsize)
+
+            # Don't cache the address if the server is already an address
+            try:
+                ipaddress.ip_address(hostname)
+                adapter = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=maxsize)
+            except ValueError:
+                pass
+            result.mount('{}://{}:{}/'.format(scheme, hostname, port), adapter)
+            _SESSIONS[key] = result
+        result = _SESSIONS[key]
+    return result
+
+
+def timeout(config):
+    """Get the timeouts to use for posts.
+
+    Args:
+        config: ConfigAgent object
+
+    Returns:
+        result: (connect, read) timeouts in seconds
+
+    """
+    # Return
+    result = (config.api_connect_timeout(), config.api_read_timeout())
+    return result
@@ -0,0 +1,608 @@
+#!/usr/bin/env python3
+"""Pattoo spool of data waiting to be posted.
+
+Description:
+
+    This module:
+        1) Appends data that couldn't be posted to segment files as length
+           prefixed, checksummed records
+        2) Writes a small index when a segment is full, so that the spool
+           can be reopened without reading every record
+        3) Records acknowledged records in a separate file per segment, and
+           deletes segments once all their records are acknowledged
+        4) Evicts the oldest segments when the spool is too large or too
+           old, and skips corrupt records instead of failing
+
+"""
+# Standard libraries
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+# Pattoo libraries
+from pattoo import log
+
+# Record header: magic, payload length, CRC32, timestamp, code
+_MAGIC = b'PSR1'
+_HEADER = struct.Struct('>4sIIQB')
+
+# Index entry: offset, payload length, timestamp, code
+_INDEX = struct.Struct('>QIQB')
+
+# Acknowledged record: offset
+_ACK = struct.Struct('>Q')
+
+# Compression methods and serializers keyed by the code stored in each
+# record. The low four bits of the code are the compression method, and the
+# high four bits are the serializer
+_COMPRESSION = (None, 'gzip', 'zstd')
+_SERIALIZERS = ('json', 'msgpack')
+
+# Supported fsync policies
+FSYNC_POLICIES = ('always', 'segment', 'never')
+
+# A record waiting to be posted
+Record = namedtuple('Record', 'key timestamp compression length serializer')
+
+# Spools keyed by directory, shared by all posts
+_SPOOLS = {}
+_LOCK = threading.Lock()
+
+
+class _Segment(object):
+    """A segment file and its records."""
+
+    def __init__(self, directory, sequence):
+        """Initialize the class.
+
+        Args:
+            directory: Directory of the spool
+            sequence: Sequence number of segment
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self.sequence = sequence
+        prefix = os.path.join(directory, '{:016d}'.format(sequence))
+        self.path = '{}.seg'.format(prefix)
+        self.index_path = '{}.idx'.format(prefix)
+        self.ack_path = '{}.ack'.format(prefix)
+        self.records = {}
+        self.acknowledged = set()
+        self.size = 0
+        self.newest = 0
+        self.sealed = False
+
+    def pending(self):
+        """Get the offsets of the records that haven't been acknowledged.
+
+        Args:
+            None
+
+        Returns:
+            result: List of offsets in the order they were written
+
+        """
+        # Return
+        result = [
+            offset for offset in sorted(self.records)
+            if offset not in self.acknowledged]
+        return result
+
+    def remove(self):
+        """Delete the files of the segment.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Delete
+        for path in (self.path, self.index_path, self.ack_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+class Spool(object):
+    """Segmented, append only spool of serialized data."""
+
+    def __init__(self, directory, segment_bytes=4194304,
+                 max_bytes=104857600, max_age=604800, fsync='always'):
+        """Initialize the class.
+
+        Args:
+            directory: Directory of the spool
+            segment_bytes: Size at which a new segment is started
+            max_bytes: Size at which the oldest segments are evicted
+            max_age: Age in seconds at which segments are evicted
+            fsync: When to flush data to disk. "always" after every write,
+                "segment" when a segment is full, or "never"
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._directory = directory
+        self._segment_bytes = segment_bytes
+        self._max_bytes = max_bytes
+        self._max_age = max_age
+        self._fsync = fsync if fsync in FSYNC_POLICIES else 'always'
+        self._segments = {}
+        self._active = None
+        self._handle = None
+        self._size = 0
+        self._lock = threading.Lock()
+
+        # Replay the segments left by previous runs
+        os.makedirs(directory, exist_ok=True)
+        sequences = sorted(
+            int(filename[:-4]) for filename in os.listdir(directory)
+            if filename.endswith('.seg') and filename[:-4].isdigit())
+        for sequence in sequences:
+            segment = _Segment(directory, sequence)
+            _load(segment, sequence != sequences[-1])
+            self._segments[sequence] = segment
+
+        # Append to the newest segment
+        if bool(sequences) is True:
+            self._active = self._segments[sequences[-1]]
+        else:
+            self._active = _Segment(directory, 0)
+            self._segments[0] = self._active
+        self._handle = open(self._active.path, 'ab')
+        self._size = sum(
+            segment.size for segment in self._segments.values())
+
+        # Remove fully acknowledged segments
+        with self._lock:
+            for segment in list(self._segments.values()):
+                self._collect(segment)
+            self._evict()
+
+    def append(self, payload, timestamp, compression=None,
+               serializer='json'):
+        """Add a record to the spool.
+
+        Args:
+            payload: Serialized data
+            timestamp: Timestamp of the data
+            compression: Compression method of the data. None if
+                uncompressed
+            serializer: Serializer of the data
+
+        Returns:
+            result: Key of the record
+
+        """
+        # Initialize key variables
+        code = _COMPRESSION.index(compression) | (
+            _SERIALIZERS.index(serializer) << 4)
+        header = _HEADER.pack(
+            _MAGIC, len(payload), _checksum(timestamp, code, payload),
+            timestamp, code)
+
+        with self._lock:
+            # Start a new segment when the current one is full
+            if (self._active.size >= self._segment_bytes and
+                    bool(self._active.records) is True):
+                self._roll()
+
+            # Write the header and payload together. Don't leave a partial
+            # record behind if the disk is full
+            segment = self._active
+            offset = segment.size
+            try:
+                self._handle.write(header + payload)
+                self._handle.flush()
+                if self._fsync == 'always':
+                    os.fsync(self._handle.fileno())
+            except OSError:
+                self._truncate()
+                raise
+            segment.records[offset] = (len(payload), timestamp, code)
+            segment.size += _HEADER.size + len(payload)
+            segment.newest = max(segment.newest, timestamp)
+            self._size += _HEADER.size + len(payload)
+
+            # Keep the spool within its limits
+            self._evict()
+
+        # Return
+        result = (segment.sequence, offset)
+        return result
+
+    def records(self, newest_first=False):
+        """Get the records that haven't been acknowledged.
+
+        Args:
+            newest_first: Return the newest records first if True
+
+        Returns:
+            result: List of Record named tuples
+
+        """
+        # Initialize key variables
+        result = []
+
+        with self._lock:
+            for sequence in sorted(self._segments):
+                segment = self._segments[sequence]
+                for offset in segment.pending():
+                    (length, timestamp, code) = segment.records[offset]
+                    result.append(Record(
+                        (sequence, offset), timestamp,
+                        _COMPRESSION[code & 15], length,
+                        _SERIALIZERS[code >> 4]))
+
+        # Return
+        if newest_first is True:
+            result.reverse()
+        return result
+
+    def read(self, key):
+        """Read the payload of a record.
+
+        Corrupt records are acknowledged so that they aren't read again.
+
+        Args:
+            key: Key of the record
+
+        Returns:
+            result: Serialized data. None if the record is corrupt or no
+                longer exists
+
+        """
+        # Initialize key variables
+        (sequence, offset) = key
+        result = None
+
+        with self._lock:
+            segment = self._segments.get(sequence)
+            if segment is None or offset not in segment.records:
+                return result
+            (length, timestamp, code) = segment.records[offset]
+            try:
+                with open(segment.path, 'rb') as f_handle:
+                    f_handle.seek(offset)
+                    contents = f_handle.read(_HEADER.size + length)
+            except OSError:
+                contents = b''
+
+        # Verify the record before using it
+        payload = contents[_HEADER.size:]
+        if (len(payload) == length and
+                contents[:len(_MAGIC)] == _MAGIC and
+                _HEADER.unpack_from(contents)[2] == _checksum(
+                    timestamp, code, payload)):
+            result = payload
+        else:
+            log_message = (
+                'Skipping corrupt record at offset {} of spool segment {}'
+                ''.format(offset, segment.path))
+            log.log2warning(1077, log_message)
+            self.acknowledge([key])
+        return result
+
+    def acknowledge(self, keys):
+        """Mark records as posted.
+
+        Args:
+            keys: List of record keys
+
+        Returns:
+            None
+
+        """
+        # Group the keys by segment
+        offsets = {}
+        for sequence, offset in keys:
+            offsets.setdefault(sequence, []).append(offset)
+
+        with self._lock:
+            for sequence, _offsets in offsets.items():
+                segment = self._segments.get(sequence)
+                if segment is None:
+                    continue
+                _offsets = [
+                    offset for offset in _offsets
+                    if offset in segment.records and
+                    offset not in segment.acknowledged]
+                if bool(_offsets) is False:
+                    continue
+
+                # Append to the acknowledgement file
+                with open(segment.ack_path, 'ab') as f_handle:
+                    f_handle.write(b''.join(
+                        _ACK.pack(offset) for offset in _offsets))
+                    f_handle.flush()
+                    if self._fsync == 'always':
+                        os.fsync(f_handle.fileno())
+                segment.acknowledged.update(_offsets)
+                self._collect(segment)
+
+    def depth(self):
+        """Get the number of records that haven't been acknowledged.
+
+        Args:
+            None
+
+        Returns:
+            result: Number of records
+
+        """
+        # Return
+        with self._lock:
+            result = sum(
+                len(segment.pending()) for segment in self._segments.values())
+        return result
+
+    def close(self):
+        """Flush and close the spool.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Close
+        with self._lock:
+            self._handle.flush()
+            if self._fsync != 'never':
+                os.fsync(self._handle.fileno())
+            self._handle.close()
+
+    def _truncate(self):
+        """Remove a partially written record from the active segment.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Closing discards any data that couldn't be flushed
+        segment = self._active
+        try:
+            self._handle.close()
+        except OSError:
+            pass
+        os.truncate(segment.path, segment.size)
+        self._handle = open(segment.path, 'ab')
+
+    def _roll(self):
+        """Seal the active segment and start a new one.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Flush the segment, then write its index atomically
+        segment = self._active
+        if self._fsync != 'never':
+            os.fsync(self._handle.fileno())
+        self._handle.close()
+        temporary = '{}.tmp'.format(segment.index_path)
+        with open(temporary, 'wb') as f_handle:
+            for offset in sorted(segment.records):
+                (length, timestamp, code) = segment.records[offset]
+                f_handle.write(_INDEX.pack(offset, length, timestamp, code))
+            f_handle.flush()
+            if self._fsync != 'never':
+                os.fsync(f_handle.fileno())
+        os.replace(temporary, segment.index_path)
+        segment.sealed = True
+
+        # Start the next segment
+        self._active = _Segment(self._directory, segment.sequence + 1)
+        self._segments[self._active.sequence] = self._active
+        self._handle = open(self._active.path, 'ab')
+
+        # Remove the sealed segment if it was already fully acknowledged
+        self._collect(segment)
+
+    def _collect(self, segment):
+        """Delete a sealed segment if all its records are acknowledged.
+
+        Args:
+            segment: _Segment object
+
+        Returns:
+            None
+
+        """
+        # Delete
+        if segment.sealed is True and bool(segment.pending()) is False:
+            segment.remove()
+            del self._segments[segment.sequence]
+            self._size -= segment.size
+
+    def _evict(self):
+        """Delete the oldest sealed segments when the spool is too large or
+        too old.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        oldest = time.time() - self._max_age
+
+        for sequence in sorted(self._segments):
+            segment = self._segments[sequence]
+            if segment is self._active:
+                break
+            if self._size <= self._max_bytes and segment.newest >= oldest:
+                continue
+            log_message = (
+                'Evicting {} unposted records in spool segment {} as the '
+                'spool is too large or too old'
+                ''.format(len(segment.pending()), segment.path))
+            log.log2warning(1050, log_message)
+            self._size -= segment.size
+            segment.remove()
+            del self._segments[sequence]
+
+
+def spool(directory, config):
+    """Get the shared spool for a directory.
+
+    Args:
+        directory: Directory of the spool
+        config: ConfigAgent object
+
+    Returns:
+        result: Spool object
+
+    """
+    # Open the spool only once
+    with _LOCK:
+        if directory not in _SPOOLS:
+            _SPOOLS[directory] = Spool(
+                directory,
+                segment_bytes=config.spool_segment_bytes(),
+                max_bytes=config.spool_max_bytes(),
+                max_age=config.spool_max_age(),
+                fsync=config.spool_fsync())
+        result = _SPOOLS[directory]
+    return result
+
+
+def _load(segment, sealed):
+    """Load the records of a segment from disk.
+
+    Sealed segments are loaded from their index if it is valid. Otherwise
+    the segment is scanned, skipping corrupt records. A partially written
+    record at the end of the newest segment, left by a crash, is truncated.
+
+    Args:
+        segment: _Segment object
+        sealed: True if no more records will be added to the segment
+
+    Returns:
+        None
+
+    """
+    # Initialize key variables
+    segment.sealed = sealed
+    segment.size = os.path.getsize(segment.path)
+
+    # Use the index if there is a valid one
+    loaded = False
+    if sealed is True:
+        try:
+            with open(segment.index_path, 'rb') as f_handle:
+                index = f_handle.read()
+            if len(index) % _INDEX.size == 0:
+                for position in range(0, len(index), _INDEX.size):
+                    (offset, length, timestamp, code) = _INDEX.unpack_from(
+                        index, position)
+                    segment.records[offset] = (length, timestamp, code)
+                loaded = True
+        except OSError:
+            pass
+
+    # Otherwise scan the segment
+    if loaded is False:
+        segment.records = {}
+        end = _scan(segment)
+        if sealed is False and end < segment.size:
+            with open(segment.path, 'r+b') as f_handle:
+                f_handle.truncate(end)
+            segment.size = end
+
+    # Get the timestamp of the newest record
+    segment.newest = max(
+        [timestamp for _, timestamp, _ in segment.records.values()] or [0])
+
+    # Load the acknowledged records, ignoring a partially written entry
+    try:
+        with open(segment.ack_path, 'rb') as f_handle:
+            acks = f_handle.read()
+        for position in range(0, len(acks) - _ACK.size + 1, _ACK.size):
+            segment.acknowledged.add(_ACK.unpack_from(acks, position)[0])
+    except OSError:
+        pass
+
+
+def _scan(segment):
+    """Read the records of a segment, skipping corrupt records.
+
+    Args:
+        segment: _Segment object
+
+    Returns:
+        result: Offset after the last valid record
+
+    """
+    # Initialize key variables
+    with open(segment.path, 'rb') as f_handle:
+        contents = f_handle.read()
+    position = 0
+    result = 0
+    corrupt = 0
+
+    while position + _HEADER.size <= len(contents):
+        (magic, length, checksum, timestamp, code) = _HEADER.unpack_from(
+            contents, position)
+        start = position + _HEADER.size
+        payload = contents[start:start + length]
+        if (magic == _MAGIC and (code & 15) < len(_COMPRESSION) and
+                (code >> 4) < len(_SERIALIZERS) and
+                len(payload) == length and
+                checksum == _checksum(timestamp, code, payload)):
+            segment.records[position] = (length, timestamp, code)
+            position = start + length
+            result = position
+            continue
+
+        # Find the start of the next record
+        corrupt += 1
+        position = contents.find(_MAGIC, position + 1)
+        if position < 0:
+            break
+
+    # Report corrupt records. Data after the last valid record is either a
+    # corrupt record or one that was only partially written
+    if bool(corrupt) is True:
+        log_message = (
+            'Skipped corrupt data in {} places in spool segment {}'
+            ''.format(corrupt, segment.path))
+        log.log2warning(1049, log_message)
+    return result
+
+
+def _checksum(timestamp, code, payload):
+    """Calculate the checksum of a record.
+
+    Args:
+        timestamp: Timestamp of the data
+        code: Compression method and serializer code
+        payload: Serialized data
+
+    Returns:
+        result: CRC32
+
+    """
+    # Return
+    result = zlib.crc32(
+        payload, zlib.crc32(struct.pack('>QB', timestamp, code)))
+    return result
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""Pattoo uploader.
+
+Description:
+
+    This module:
+        1) Posts polled data from a background thread, so that polling
+           stays on schedule however slow the server is
+        2) Holds data waiting to be posted in a bounded queue
+        3) Adds data to the disk spool instead of the queue when the queue
+           is full, so that a slow server can't use up memory
+        4) Spools the queued data, and the data being posted, when stopped
+
+"""
+# Standard libraries
+import threading
+from collections import deque
+
+# Pattoo libraries
+from pattoo import log
+from pattoo import post
+from pattoo import overhead as pattoo_overhead
+
+
+class Uploader(object):
+    """Post polled data in a background thread."""
+
+    def __init__(self, queue_size=10, overhead=None):
+        """Initialize the class.
+
+        Args:
+            queue_size: Maximum number of polls waiting to be posted
+            overhead: pattoo.overhead.Overhead object to record the costs
+                of each post in. None if not recording costs
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._queue = deque()
+        self._queue_size = max(1, queue_size)
+        self._overhead = overhead
+        self._thread = None
+        self._current = None
+        self._stopped = False
+        self._condition = threading.Condition()
+
+    def start(self):
+        """Start posting in a background thread.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Start
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop posting and spool the data that hasn't been posted.
+
+        The data being posted is spooled too, as the process is about to
+        exit. It is posted twice if its post completes in the meantime.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Take the data from the thread, so that it is only spooled here
+        with self._condition:
+            self._stopped = True
+            pending = list(self._queue)
+            if self._current is not None:
+                pending.insert(0, self._current)
+            self._queue.clear()
+            self._condition.notify_all()
+
+        # Spool it
+        for data_dict in pending:
+            post.Data(data_dict).save()
+
+    def put(self, data_dict):
+        """Queue polled data to be posted.
+
+        Args:
+            data_dict: Polled data
+
+        Returns:
+            result: True if queued. False if spooled because the queue was
+                full
+
+        """
+        # Queue the data
+        with self._condition:
+            result = len(self._queue) < self._queue_size
+            if result is True:
+                self._queue.append(data_dict)
+                self._condition.notify()
+
+        # Spool the data if the uploader can't keep up
+        if result is False:
+            log_message = (
+                'Upload queue is full. Spooling data from {}'
+                ''.format(data_dict['timestamp']))
+            log.log2warning(1053, log_message)
+            server = post.Data(data_dict)
+            server.save()
+            self._record(server, data_dict, server.payload_bytes, None)
+        return result
+
+    def depth(self):
+        """Get the number of polls waiting to be posted.
+
+        Args:
+            None
+
+        Returns:
+            result: Number of polls
+
+        """
+        # Return
+        with self._condition:
+            result = len(self._queue)
+        return result
+
+    def upload(self, data_dict):
+        """Post polled data to the central server.
+
+        Args:
+            data_dict: Polled data
+
+        Returns:
+            None
+
+        """
+        # Post data
+        server = post.Data(data_dict)
+        success = server.post()
+        payload_bytes = server.payload_bytes
+        post_seconds = server.post_seconds
+
+        # Purge cache if success is True
+        if success is True:
+            server.purge()
+
+        # Record the costs of this post for the next upload
+        self._record(server, data_dict, payload_bytes, post_seconds)
+
+    def _record(self, server, data_dict, payload_bytes, post_seconds):
+        """Record the costs of posting or spooling data.
+
+        Args:
+            server: pattoo.post.Data object
+            data_dict: Polled data
+            payload_bytes: Size of the serialized data
+            post_seconds: Seconds taken to post the data. None if the data
+                wasn't posted
+
+        Returns:
+            None
+
+        """
+        # Record
+        if self._overhead is not None:
+            self._overhead.record(
+                payload_bytes, pattoo_overhead.series(data_dict),
+                post_seconds=post_seconds, spool_depth=server.spool_depth())
+
+    def _run(self):
+        """Post queued data until stopped.
+
+        Args:
+            None
+
+        Returns:
+            None
+
+        """
+        # Post
+        while True:
+            with self._condition:
+                while bool(self._queue) is False and self._stopped is False:
+                    self._condition.wait()
+                if self._stopped is True:
+                    break
+                data_dict = self._queue.popleft()
+                self._current = data_dict
+            try:
+                self.upload(data_dict)
+            except Exception as error:
+                log_message = 'Failed to upload data: {}'.format(error)
+                log.log2warning(1054, log_message)
+            with self._condition:
+                self._current = None
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""Pattoo filesystem usage.
+
+Description:
+
+    This module:
+        1) Reads the usage of local filesystems directly
+        2) Reads the usage of network and FUSE filesystems in a small
+           isolated thread pool with a hard timeout, so that a hung server
+           can't block the agent
+        3) Reuses the last known usage of filesystems that time out, and
+           quarantines them with exponential backoff
+        4) Replaces the thread pool when all of its threads are hung, so
+           that the remaining filesystems are still read
+
+"""
+# Standard libraries
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+# pip3 libraries
+import psutil
+
+# Pattoo libraries
+from pattoo import log
+
+# Filesystem types whose usage may block on a remote server
+_REMOTE = frozenset([
+    '9p', 'afs', 'ceph', 'cifs', 'glusterfs', 'lustre', 'ncpfs', 'nfs',
+    'nfs4', 'smb3', 'smbfs', 'sshfs'])
+
+# Seconds that a filesystem is quarantined after its first timeout, and the
+# most that the quarantine can grow to
+_BACKOFF_MIN = 60
+_BACKOFF_MAX = 3600
+
+
+def remote(fstype):
+    """Determine whether reading a filesystem may block on a remote server.
+
+    Args:
+        fstype: Filesystem type
+
+    Returns:
+        result: True if the filesystem is a network or FUSE filesystem
+
+    """
+    # Return
+    result = fstype in _REMOTE or fstype.startswith('fuse')
+    return result
+
+
+class DiskUsage(object):
+    """Read filesystem usage without blocking on hung servers."""
+
+    def __init__(self, workers=2):
+        """Initialize the class.
+
+        Args:
+            workers: Number of threads used for network filesystems
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._last = {}
+        self._quarantine = {}
+        self._pending = {}
+        self._stuck = set()
+        self._workers = workers
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def usage(self, partitions, timeout):
+        """Read the usage of filesystems.
+
+        Args:
+            partitions: List of psutil disk partition named tuples
+            timeout: Seconds to wait for network filesystems
+
+        Returns:
+            result: Dict of psutil disk usage named tuples keyed by mount
+                point
+
+        """
+        # Initialize key variables
+        result = {}
+        futures = []
+        now = time.monotonic()
+
+        with self._lock:
+            for partition in partitions:
+                mountpoint = partition.mountpoint
+                if remote(partition.fstype) is False:
+                    result[mountpoint] = psutil.disk_usage(mountpoint)
+                    continue
+
+                # Use the last known value while quarantined
+                (until, _) = self._quarantine.get(mountpoint, (0, 0))
+                if now < until:
+                    if mountpoint in self._last:
+                        result[mountpoint] = self._last[mountpoint]
+                    continue
+
+                # Don't start another read while one is still hung
+                future = self._pending.pop(mountpoint, None)
+                if future is not None and future.done() is False:
+                    self._hung(mountpoint, future, timeout)
+                    if mountpoint in self._last:
+                        result[mountpoint] = self._last[mountpoint]
+                    continue
+                future = self._submit(mountpoint)
+                futures.append((mountpoint, future))
+
+            # Wait for all network filesystems at once
+            deadline = now + timeout
+            for mountpoint, future in futures:
+                try:
+                    value = future.result(
+                        timeout=max(deadline - time.monotonic(), 0))
+                except FutureTimeoutError:
+                    # Reads that never started aren't the filesystem's fault
+                    if future.cancel() is False:
+                        self._hung(mountpoint, future, timeout)
+                    if mountpoint in self._last:
+                        result[mountpoint] = self._last[mountpoint]
+                    continue
+                except OSError as error:
+                    log_message = (
+                        'Unable to read usage of filesystem "{}": {}'
+                        ''.format(mountpoint, error))
+                    log.log2warning(1073, log_message)
+                    continue
+                self._last[mountpoint] = value
+                self._quarantine.pop(mountpoint, None)
+                result[mountpoint] = value
+
+        return result
+
+    def quarantined(self):
+        """Get the quarantined filesystems.
+
+        Args:
+            None
+
+        Returns:
+            result: List of mount points
+
+        """
+        # Return
+        now = time.monotonic()
+        with self._lock:
+            result = [
+                mountpoint for mountpoint, (until, _) in sorted(
+                    self._quarantine.items()) if now < until]
+        return result
+
+    def _submit(self, mountpoint):
+        """Start reading the usage of a filesystem in the thread pool.
+
+        Args:
+            mountpoint: Mount point of filesystem
+
+        Returns:
+            result: Future of the read
+
+        """
+        # Replace the thread pool if all of its threads are hung. The hung
+        # threads end with the old pool if their reads ever return
+        self._stuck = set(
+            future for future in self._stuck if future.done() is False)
+        if len(self._stuck) >= self._workers:
+            self._executor.shutdown(wait=False)
+            self._executor = ThreadPoolExecutor(max_workers=self._workers)
+            self._stuck = set()
+
+        # Return
+        result = self._executor.submit(psutil.disk_usage, mountpoint)
+        return result
+
+    def _hung(self, mountpoint, future, timeout):
+        """Quarantine a filesystem that didn't respond in time.
+
+        Args:
+            mountpoint: Mount point of filesystem
+            future: Future of the read that is still running
+            timeout: Seconds that the read was given
+
+        Returns:
+            None
+
+        """
+        # Double the quarantine each time the filesystem times out
+        (_, backoff) = self._quarantine.get(mountpoint, (0, 0))
+        backoff = min(max(backoff * 2, _BACKOFF_MIN), _BACKOFF_MAX)
+        self._quarantine[mountpoint] = (time.monotonic() + backoff, backoff)
+        self._pending[mountpoint] = future
+        self._stuck.add(future)
+        log_message = (
+            'Usage of filesystem "{}" was not read within {}s. Using the '
+            'last known value for the next {}s.'
+            ''.format(mountpoint, timeout, backoff))
+        log.log2warning(1041, log_message)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Test the pattoo.breaker module."""
+
+# Standard libraries
+import time
+import unittest
+
+# Pattoo libraries
+from pattoo import breaker
+
+
+class TestBreaker(unittest.TestCase):
+    """Checks all functions of Breaker."""
+
+    def test_transitions(self):
+        """Test closed, open, half open and closed again."""
+        # Initialize key variables
+        _breaker = breaker.Breaker(threshold=2, backoff=0.05)
+
+        # Open after consecutive failures
+        self.assertTrue(_breaker.allow())
+        _breaker.record(None)
+        self.assertEqual(_breaker.state(), breaker.CLOSED)
+        _breaker.record(503)
+        self.assertEqual(_breaker.state(), breaker.OPEN)
+        self.assertFalse(_breaker.allow())
+
+        # Let a single probe through once the backoff has passed
+        time.sleep(0.06)
+        self.assertTrue(_breaker.allow())
+        self.assertEqual(_breaker.state(), breaker.HALF_OPEN)
+        self.assertFalse(_breaker.allow())
+
+        # Close when the probe gets a response. Client errors count
+        _breaker.record(404)
+        self.assertEqual(_breaker.state(), breaker.CLOSED)
+        self.assertTrue(_breaker.allow())
+
+        # Count each transition
+        aggregates = dict(
+            (label, values) for label, _, _, values in _breaker.aggregates())
+        self.assertEqual(
+            aggregates['pattoo_agent_breaker_state'], [1, 0, 0])
+        self.assertEqual(
+            aggregates['pattoo_agent_breaker_transitions'], [1, 1, 1])
+
+    def test_failed_probe(self):
+        """Test reopening after a failed probe."""
+        # Initialize key variables
+        _breaker = breaker.Breaker(threshold=1, backoff=0.05)
+        _breaker.failure()
+        time.sleep(0.06)
+        self.assertTrue(_breaker.allow())
+
+        # Reopen for longer
+        _breaker.failure()
+        self.assertEqual(_breaker.state(), breaker.OPEN)
+        self.assertGreater(_breaker._retry - time.monotonic(), 0.05 / 2)
+
+    def test_backoff(self):
+        """Test the delay before the next probe."""
+        # Initialize key variables
+        _breaker = breaker.Breaker(threshold=1, backoff=10, max_backoff=25)
+
+        # The delay doubles after each failed probe, with equal jitter,
+        # up to the maximum
+        for maximum in (10, 20, 25, 25):
+            _breaker._state = breaker.HALF_OPEN
+            _breaker.failure()
+            delay = _breaker._retry - time.monotonic()
+            self.assertGreaterEqual(delay, maximum / 2 - 1)
+            self.assertLessEqual(delay, maximum)
+
+    def test_probe_timeout(self):
+        """Test reopening when the outcome of a probe is never recorded."""
+        # Initialize key variables
+        _breaker = breaker.Breaker(
+            threshold=1, backoff=0.05, probe_timeout=0.05)
+        _breaker.failure()
+        time.sleep(0.06)
+        self.assertTrue(_breaker.allow())
+
+        # The lost probe counts as a failure
+        time.sleep(0.06)
+        self.assertFalse(_breaker.allow())
+        self.assertEqual(_breaker.state(), breaker.OPEN)
+
+    def test_no_threshold(self):
+        """Test a breaker that never opens."""
+        # Initialize key variables
+        _breaker = breaker.Breaker(threshold=0)
+        for _ in range(10):
+            _breaker.record(None)
+        self.assertEqual(_breaker.state(), breaker.CLOSED)
+        self.assertTrue(_breaker.allow())
+
+
+if __name__ == '__main__':
+    # Do the unit test
+    unittest.main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Test the pattoo.cgroups module."""
+
+# Standard libraries
+import os
+import tempfile
+import unittest
+from collections import defaultdict
+
+# Pattoo libraries
+from pattoo import cgroups
+
+# io.stat of a cgroup with the io.cost and io.latency controllers enabled
+_IO_STAT = (
+    '8:16 rbytes=1459200 wbytes=314773504 rios=192 wios=353 dbytes=0 '
+    'dios=0 cost.vrate=135.29 cost.usage=8361 cost.wait=0 '
+    'cost.indebt=0 cost.indelay=0\n'
+    '8:0 rbytes=90430464 wbytes=299008000 rios=8950 wios=1252 dbytes=50 '
+    'dios=3 depth=max avg_lat=1022.45 win=50\n')
+
+
+class TestReadCgroup(unittest.TestCase):
+    """Checks all functions of _read_cgroup."""
+
+    def test_io_stat(self):
+        """Test reading io.stat."""
+        # Initialize key variables
+        gauges = defaultdict(dict)
+        counters = defaultdict(dict)
+
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'io.stat'), 'w') as f_handle:
+                f_handle.write(_IO_STAT)
+            cgroups._read_cgroup(directory, '/test', gauges, counters)
+
+        # Only the integer counters are added up across devices
+        expected = {
+            'io_rbytes': 91889664,
+            'io_wbytes': 613781504,
+            'io_rios': 9142,
+            'io_wios': 1605,
+            'io_dbytes': 50,
+            'io_dios': 3,
+        }
+        self.assertEqual(
+            {key: value['/test'] for key, value in counters.items()},
+            expected)
+        self.assertEqual(dict(gauges), {})
+
+
+if __name__ == '__main__':
+    # Do the unit test
+    unittest.main()
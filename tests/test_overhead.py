@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""Test the pattoo.overhead module."""
+
+# Standard libraries
+import json
+import unittest
+
+# Pattoo libraries
+from pattoo import overhead
+
+
+class TestOverhead(unittest.TestCase):
+    """Checks all functions of Overhead."""
+
+    def test_summary(self):
+        """Test summary."""
+        # Initialize key variables
+        costs = overhead.Overhead(capacity=4)
+        self.assertEqual(costs.summary(), {})
+
+        # Overwrite the oldest cycle
+        for payload_bytes in (100, 200, 300, 400, 500):
+            costs.record(
+                payload_bytes, 10, post_seconds=0.5, spool_depth=0)
+        result = costs.summary()
+        self.assertEqual(result['last']['payload_bytes'], 500)
+        self.assertEqual(result['min']['payload_bytes'], 200)
+        self.assertEqual(result['max']['payload_bytes'], 500)
+        self.assertEqual(result['mean']['payload_bytes'], 350)
+
+    def test_summary_spooled(self):
+        """Test summary when the latest cycle was spooled."""
+        # Initialize key variables
+        costs = overhead.Overhead()
+        costs.record(100, 10, post_seconds=0.5, spool_depth=3)
+        costs.record(200, 10)
+        result = costs.summary()
+
+        # The last costs are from the cycle that posted
+        self.assertEqual(result['last']['payload_bytes'], 200)
+        self.assertEqual(result['last']['post_seconds'], 0.5)
+        self.assertEqual(result['last']['spool_depth'], 3)
+
+        # There are no NaNs to break the JSON of the data
+        json.dumps(result, allow_nan=False)
+
+    def test_summary_not_recorded(self):
+        """Test summary when costs don't apply to the agent."""
+        # Initialize key variables
+        costs = overhead.Overhead()
+        costs.record(100, 10)
+        result = costs.summary()
+
+        # Leave out the costs
+        for values in result.values():
+            self.assertNotIn('post_seconds', values)
+            self.assertNotIn('spool_depth', values)
+        json.dumps(result, allow_nan=False)
+
+    def test_log(self):
+        """Test log as a signal handler."""
+        # Initialize key variables
+        costs = overhead.Overhead()
+        costs.record(100, 10)
+
+        # The costs are logged by the next call to aggregates()
+        costs.log(10, None)
+        self.assertTrue(costs._requested)
+        labels = [label for label, _, _ in costs.aggregates()]
+        self.assertFalse(costs._requested)
+        self.assertIn('pattoo_agent_overhead_last', labels)
+
+
+if __name__ == '__main__':
+    # Do the unit test
+    unittest.main()
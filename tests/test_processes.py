@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Test the pattoo.processes module."""
+
+# Standard libraries
+import os
+import unittest
+
+# pip3 libraries
+import psutil
+
+# Pattoo libraries
+from pattoo import procfs
+from pattoo import processes
+
+
+class TestProcesses(unittest.TestCase):
+    """Checks all functions of Processes."""
+
+    def test_start_time(self):
+        """Test pattoo.procfs.start_time."""
+        # The start time never changes
+        pid = os.getpid()
+        self.assertEqual(procfs.start_time(pid), procfs.start_time(pid))
+        self.assertGreater(procfs.start_time(pid), procfs.start_time(1))
+
+        # Processes that don't exist
+        with self.assertRaises(psutil.NoSuchProcess):
+            procfs.start_time(2 ** 31)
+
+    def test_reused_pid(self):
+        """Test replacing the process of a reused PID."""
+        # Initialize key variables
+        _processes = processes.Processes()
+        pid = os.getpid()
+        _processes.top(1)
+        sample = _processes._samples[pid]
+
+        # Reuse the process while the PID is unchanged
+        _processes.top(1)
+        self.assertIs(_processes._samples[pid].process, sample.process)
+
+        # Replace it once the start time changes
+        _processes._samples[pid].key = (pid, sample.key[1] - 1)
+        _processes.top(1)
+        self.assertIsNot(_processes._samples[pid].process, sample.process)
+        self.assertEqual(_processes._samples[pid].key, sample.key)
+
+
+if __name__ == '__main__':
+    # Do the unit test
+    unittest.main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Test the pattoo.rates module."""
+
+# Standard libraries
+import unittest
+
+# Pattoo libraries
+from pattoo import data
+from pattoo import rates
+
+
+class TestRates(unittest.TestCase):
+    """Checks all functions of the rates module."""
+
+    def test_delta(self):
+        """Test _delta."""
+        # Counters that increase
+        self.assertEqual(rates._delta(100, 150), 50)
+        self.assertEqual(rates._delta(1.5, 2.5), 1.0)
+
+        # Counters that wrap
+        self.assertEqual(rates._delta(2 ** 32 - 10, 5), 15)
+        self.assertEqual(rates._delta(2 ** 64 - 10, 5), 15)
+
+        # Counters that were reset
+        self.assertIsNone(rates._delta(1000, 10))
+        self.assertIsNone(rates._delta(2 ** 40, 10))
+        self.assertIsNone(rates._delta(2.5, 1.5))
+
+    def test_rate(self):
+        """Test _rate."""
+        # Initialize key variables
+        series = data.Series(
+            'disk_io_read_bytes', 64, 'Disk Read Bytes',
+            ['sda', 'sdb', 'sdc', 'sdd'], [300, 5, 10, 50])
+        previous = {'sda': 100, 'sdb': 2 ** 64 - 5, 'sdc': 1000}
+        current = dict(zip(series.sources, series.values))
+
+        # New and reset sources are left out
+        self.assertEqual(
+            rates._rate(series, previous, current, 10),
+            ('disk_io_read_bytes_rate', 1, ['sda', 'sdb'], [20.0, 1.0],
+             'Disk Read Bytes (Per Second)'))
+
+        # No rate if no time has passed
+        self.assertIsNone(rates._rate(series, previous, current, 0))
+
+
+if __name__ == '__main__':
+    # Do the unit test
+    unittest.main()
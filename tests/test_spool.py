@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""Test the pattoo.spool module."""
+
+# Standard libraries
+import errno
+import os
+import tempfile
+import time
+import unittest
+
+# Pattoo libraries
+from pattoo import spool
+
+
+class _Full(object):
+    """File that runs out of space part way through a write."""
+
+    def __init__(self, handle):
+        """Initialize the class.
+
+        Args:
+            handle: File to write to
+
+        Returns:
+            None
+
+        """
+        # Initialize key variables
+        self._handle = handle
+
+    def write(self, data):
+        """Write the first few bytes of data, then fail."""
+        self._handle.write(data[:10])
+        self._handle.flush()
+        raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC))
+
+    def flush(self):
+        """Flush the file."""
+        self._handle.flush()
+
+    def fileno(self):
+        """Get the file descriptor."""
+        return self._handle.fileno()
+
+    def close(self):
+        """Close the file."""
+        self._handle.close()
+
+
+class TestSpool(unittest.TestCase):
+    """Checks all functions of Spool."""
+
+    def setUp(self):
+        """Create an empty spool directory."""
+        self._directory = tempfile.TemporaryDirectory()
+        self.directory = self._directory.name
+        self.now = int(time.time())
+
+    def tearDown(self):
+        """Delete the spool directory."""
+        self._directory.cleanup()
+
+    def _spool(self, **kwargs):
+        """Open the spool."""
+        kwargs.setdefault('fsync', 'never')
+        result = spool.Spool(self.directory, **kwargs)
+        self.addCleanup(_close, result)
+        return result
+
+    def test_round_trip(self):
+        """Test reading records back, including after reopening."""
+        # Initialize key variables
+        _spool = self._spool(segment_bytes=100)
+        keys = [
+            _spool.append(b'a' * 60, self.now),
+            _spool.append(b'b' * 60, self.now + 1, compression='gzip'),
+            _spool.append(b'c' * 60, self.now + 2, serializer='msgpack')]
+        _spool.close()
+
+        # Records are returned in order from every segment
+        _spool = self._spool(segment_bytes=100)
+        records = _spool.records()
+        self.assertEqual([record.key for record in records], keys)
+        self.assertEqual(
+            [record.compression for record in records],
+            [None, 'gzip', None])
+        self.assertEqual(
+            [record.serializer for record in records],
+            ['json', 'json', 'msgpack'])
+        self.assertEqual(_spool.read(keys[1]), b'b' * 60)
+        self.assertEqual(
+            [record.key for record in _spool.records(newest_first=True)],
+            keys[::-1])
+        self.assertEqual(_spool.depth(), 3)
+
+    def test_acknowledge(self):
+        """Test acknowledging records."""
+        # Initialize key variables
+        _spool = self._spool(segment_bytes=100)
+        keys = [
+            _spool.append(b'x' * 60, self.now + index)
+            for index in range(3)]
+        sealed = os.path.join(self.directory, '{:016d}.seg'.format(0))
+
+        # Fully acknowledged sealed segments are deleted
+        _spool.acknowledge(keys[:2])
+        self.assertEqual(_spool.depth(), 1)
+        self.assertFalse(os.path.exists(sealed))
+        self.assertIsNone(_spool.read(keys[0]))
+
+        # Acknowledgements survive reopening
+        _spool.close()
+        _spool = self._spool(segment_bytes=100)
+        self.assertEqual(
+            [record.key for record in _spool.records()], keys[2:])
+
+    def test_partial_record(self):
+        """Test recovery from a record left partially written by a crash."""
+        # Initialize key variables
+        _spool = self._spool()
+        key = _spool.append(b'x' * 60, self.now)
+        _spool.close()
+        path = os.path.join(self.directory, '{:016d}.seg'.format(0))
+        size = os.path.getsize(path)
+        with open(path, 'ab') as f_handle:
+            f_handle.write(spool._MAGIC + b'\x00' * 5)
+
+        # The partial record is truncated when the spool is reopened
+        _spool = self._spool()
+        self.assertEqual(os.path.getsize(path), size)
+        self.assertEqual([record.key for record in _spool.records()], [key])
+        key = _spool.append(b'y' * 60, self.now)
+        self.assertEqual(_spool.read(key), b'y' * 60)
+
+    def test_failed_write(self):
+        """Test recovery from a write that runs out of space."""
+        # Initialize key variables
+        _spool = self._spool()
+        _spool.append(b'x' * 60, self.now)
+        path = os.path.join(self.directory, '{:016d}.seg'.format(0))
+        size = os.path.getsize(path)
+
+        # The partial record is removed before the error is raised
+        _spool._handle = _Full(_spool._handle)
+        with self.assertRaises(OSError):
+            _spool.append(b'y' * 60, self.now)
+        self.assertEqual(os.path.getsize(path), size)
+
+        # The next record is readable
+        key = _spool.append(b'z' * 60, self.now)
+        self.assertEqual(_spool.read(key), b'z' * 60)
+        self.assertEqual(_spool.depth(), 2)
+
+    def test_corrupt_record(self):
+        """Test skipping a corrupt record."""
+        # Initialize key variables
+        _spool = self._spool(segment_bytes=100)
+        keys = [
+            _spool.append(b'x' * 60, self.now + index)
+            for index in range(3)]
+        _spool.close()
+        path = os.path.join(self.directory, '{:016d}.seg'.format(0))
+        with open(path, 'r+b') as f_handle:
+            f_handle.seek(spool._HEADER.size + 1)
+            f_handle.write(b'y')
+
+        # Sealed segments are loaded from their index, so the corruption
+        # is found when the record is read
+        _spool = self._spool(segment_bytes=100)
+        self.assertIsNone(_spool.read(keys[0]))
+        self.assertEqual(
+            [record.key for record in _spool.records()], keys[1:])
+
+    def test_evict_size(self):
+        """Test evicting the oldest segments when the spool is too large."""
+        # Initialize key variables
+        _spool = self._spool(segment_bytes=100, max_bytes=300)
+        keys = [
+            _spool.append(b'x' * 60, self.now + index)
+            for index in range(10)]
+
+        # Only the newest records are kept
+        remaining = [record.key for record in _spool.records()]
+        self.assertEqual(remaining, keys[-len(remaining):])
+        self.assertLess(len(remaining), 10)
+        self.assertLessEqual(
+            _spool._size, 300 + spool._HEADER.size + 60)
+        self.assertEqual(_spool._size, sum(
+            os.path.getsize(os.path.join(self.directory, filename))
+            for filename in os.listdir(self.directory)
+            if filename.endswith('.seg')))
+
+    def test_evict_age(self):
+        """Test evicting segments that are too old."""
+        # Initialize key variables
+        _spool = self._spool(segment_bytes=100, max_age=3600)
+        _spool.append(b'x' * 60, self.now - 7200)
+        _spool.append(b'x' * 60, self.now - 7200)
+        key = _spool.append(b'y' * 60, self.now)
+
+        # The active segment is never evicted
+        self.assertEqual([record.key for record in _spool.records()], [key])
+
+
+def _close(_spool):
+    """Close a spool unless the test already did."""
+    if _spool._handle.closed is False:
+        _spool.close()
+
+
+if __name__ == '__main__':
+    # Do the unit test
+    unittest.main()